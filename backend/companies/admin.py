@@ -1,9 +1,13 @@
 from django.contrib import admin
+from django.db import transaction
 from django.db.models import Count
+from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from .cache import bump_generation
 from .models import Company, DataVersion, CompanyAlternative, CompanyRequest
+from .names import name_key
 
 
 class CompanyAlternativeInline(admin.TabularInline):
@@ -107,6 +111,14 @@ class CompanyAdmin(admin.ModelAdmin):
     # Admin actions
     actions = ['mark_carbon_neutral', 'mark_not_carbon_neutral', 'clear_renewable_data']
     
+    def get_search_results(self, request, queryset, search_term):
+        """Also match the folded name key, so 'ARÇELİK' finds 'Arçelik A.Ş.' (used by autocomplete too)."""
+        matches, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        key = name_key(search_term)
+        if key:
+            matches |= queryset.filter(name_key__contains=key)
+        return matches, may_have_duplicates
+    
     def carbon_neutral_badge(self, obj):
         """Display carbon neutral status as a colored badge."""
         if obj.carbon_neutral:
@@ -173,9 +185,26 @@ class CompanyAdmin(admin.ModelAdmin):
         return format_html('<span style="color: gray;">-</span>')
     has_description.short_description = 'Description'
     
+    def update_companies(self, queryset, **values):
+        """
+        Bulk-update the selected companies for an admin action.
+        update() fires no signals, so the stored documents of the companies and of those
+        listing them as alternatives are re-rendered here before the generation is bumped.
+        Returns the number of companies updated.
+        """
+        with transaction.atomic():
+            company_ids = list(queryset.values_list('pk', flat=True))
+            updated = Company.objects.filter(pk__in=company_ids).update(updated_at=timezone.now(), **values)
+            dependents = CompanyAlternative.objects.filter(
+                to_company_id__in=company_ids
+            ).values_list('from_company_id', flat=True)
+            Company.refresh_documents([*company_ids, *dependents])
+        bump_generation()
+        return updated
+    
     def mark_carbon_neutral(self, request, queryset):
         """Admin action to mark companies as carbon neutral."""
-        updated = queryset.update(carbon_neutral=True)
+        updated = self.update_companies(queryset, carbon_neutral=True)
         self.message_user(
             request, 
             '{} companies marked as carbon neutral.'.format(updated)
@@ -184,7 +213,7 @@ class CompanyAdmin(admin.ModelAdmin):
     
     def mark_not_carbon_neutral(self, request, queryset):
         """Admin action to mark companies as not carbon neutral."""
-        updated = queryset.update(carbon_neutral=False)
+        updated = self.update_companies(queryset, carbon_neutral=False)
         self.message_user(
             request, 
             '{} companies marked as not carbon neutral.'.format(updated)
@@ -193,7 +222,7 @@ class CompanyAdmin(admin.ModelAdmin):
     
     def clear_renewable_data(self, request, queryset):
         """Admin action to clear renewable energy data."""
-        updated = queryset.update(renewable_share_percent=None)
+        updated = self.update_companies(queryset, renewable_share_percent=None)
         self.message_user(
             request, 
             'Cleared renewable energy data for {} companies.'.format(updated)
@@ -352,6 +381,7 @@ class DataVersionAdmin(admin.ModelAdmin):
         for version in queryset:
             version.update_counts()
             updated_count += 1
+        bump_generation()
         
         self.message_user(
             request,
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class CompaniesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'companies'
-    verbose_name = 'Company Sustainability Data'
\ No newline at end of file
+    verbose_name = 'Company Sustainability Data'
+
+    def ready(self):
+        from . import signals  # noqa: F401
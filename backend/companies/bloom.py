@@ -0,0 +1,198 @@
+"""
+Compact Bloom filter over normalized company domains.
+Used to reject lookups for unknown domains before they reach the database.
+
+Hashing is deliberately simple so clients can reproduce it: positions are
+(h1 + i * h2) mod m for i in 0..k-1, where h1 and h2 are 32-bit FNV-1a hashes
+of the UTF-8 domain with offset bases 0x811C9DC5 and 0x01000193 (h2 forced odd).
+Bit p is set when byte p // 8 has bit (p % 8) set.
+
+Binary formats (all integers big-endian):
+    full filter:  b'YDBF' | format u8 | hashes u8 | bits u32 | items u32 | bit array
+    delta:        b'YDBD' | format u8 | hashes u8 | bits u32 | items u32 | changes u32 |
+                  changes × (varint gap from previous changed byte index, new byte value u8)
+A delta can only be applied to a filter with the same number of bits and hashes.
+"""
+
+import math
+import struct
+
+FORMAT_VERSION = 1
+FULL_MAGIC = b'YDBF'
+DELTA_MAGIC = b'YDBD'
+_HEADER = struct.Struct('>4sBBII')
+_COUNT = struct.Struct('>I')
+
+FNV_PRIME = 0x01000193
+FNV_OFFSET_BASIS = 0x811C9DC5
+FNV_SECOND_BASIS = 0x01000193
+
+
+def fnv1a_32(data, basis=FNV_OFFSET_BASIS):
+    """32-bit FNV-1a hash of a bytes object."""
+    value = basis
+    for byte in data:
+        value ^= byte
+        value = (value * FNV_PRIME) & 0xFFFFFFFF
+    return value
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter backed by a bytearray.
+    False positives are possible, false negatives are not.
+    """
+
+    def __init__(self, size_bits, hash_count, bits=None, item_count=0):
+        if size_bits < 8 or hash_count < 1:
+            raise ValueError("Bloom filter needs at least 8 bits and one hash")
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.item_count = item_count
+        self.bits = bytearray(bits) if bits is not None else bytearray((size_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate):
+        """
+        Size a filter for the expected number of items and target false-positive rate.
+        m = -n·ln(p) / ln(2)², k = (m / n)·ln(2)
+        """
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+        capacity = max(1, capacity)
+        size_bits = max(8, math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        hash_count = max(1, round(size_bits / capacity * math.log(2)))
+        return cls(size_bits, hash_count)
+
+    @staticmethod
+    def capacity_bucket(item_count, minimum=1024):
+        """
+        Round a capacity up to the next power of two so the filter geometry stays
+        stable while the dataset grows, which keeps deltas between versions small.
+        """
+        capacity = minimum
+        while capacity < item_count:
+            capacity *= 2
+        return capacity
+
+    def _positions(self, item):
+        data = item.encode('utf-8')
+        h1 = fnv1a_32(data)
+        h2 = fnv1a_32(data, FNV_SECOND_BASIS) | 1
+        m = self.size_bits
+        return [(h1 + i * h2) % m for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Add a string to the filter."""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.item_count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def might_contain_any(self, items):
+        """True if any of the strings may be in the filter."""
+        return any(item in self for item in items)
+
+    @property
+    def memory_bytes(self):
+        return len(self.bits)
+
+    def estimated_false_positive_rate(self):
+        """Expected false-positive rate for the items added so far: (1 - e^(-kn/m))^k."""
+        if not self.item_count:
+            return 0.0
+        k, m, n = self.hash_count, self.size_bits, self.item_count
+        return (1 - math.exp(-k * n / m)) ** k
+
+    def to_bytes(self):
+        """Serialize to the full binary format."""
+        header = _HEADER.pack(FULL_MAGIC, FORMAT_VERSION, self.hash_count, self.size_bits, self.item_count)
+        return header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a filter from the full binary format."""
+        magic, version, hash_count, size_bits, item_count = _HEADER.unpack_from(data)
+        if magic != FULL_MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a domain filter artifact")
+        return cls(size_bits, hash_count, bits=data[_HEADER.size:], item_count=item_count)
+
+    def stats(self):
+        return {
+            'items': self.item_count,
+            'bits': self.size_bits,
+            'hashes': self.hash_count,
+            'memoryBytes': self.memory_bytes,
+            'estimatedFalsePositiveRate': round(self.estimated_false_positive_rate(), 6),
+        }
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_delta(old_artifact, new_artifact):
+    """
+    Encode the bytes that changed between two full artifacts.
+    Returns None when the filters have different geometry and no delta is possible.
+    """
+    old_magic, _, old_hashes, old_bits, _ = _HEADER.unpack_from(old_artifact)
+    new_magic, _, new_hashes, new_bits, new_items = _HEADER.unpack_from(new_artifact)
+    if old_magic != FULL_MAGIC or new_magic != FULL_MAGIC:
+        raise ValueError("Not a domain filter artifact")
+    if (old_hashes, old_bits) != (new_hashes, new_bits):
+        return None
+
+    old_body = memoryview(old_artifact)[_HEADER.size:]
+    new_body = memoryview(new_artifact)[_HEADER.size:]
+    changes = bytearray()
+    change_count = 0
+    previous = 0
+    for index in range(len(new_body)):
+        if old_body[index] != new_body[index]:
+            _write_varint(changes, index - previous)
+            changes.append(new_body[index])
+            previous = index
+            change_count += 1
+
+    header = _HEADER.pack(DELTA_MAGIC, FORMAT_VERSION, new_hashes, new_bits, new_items)
+    return header + _COUNT.pack(change_count) + bytes(changes)
+
+
+def apply_delta(old_artifact, delta):
+    """Apply a delta produced by encode_delta to a full artifact and return the new artifact."""
+    magic, version, hash_count, size_bits, item_count = _HEADER.unpack_from(delta)
+    if magic != DELTA_MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a domain filter delta")
+    base = BloomFilter.from_bytes(old_artifact)
+    if (base.hash_count, base.size_bits) != (hash_count, size_bits):
+        raise ValueError("Delta does not match the base filter geometry")
+
+    (change_count,) = _COUNT.unpack_from(delta, _HEADER.size)
+    offset = _HEADER.size + _COUNT.size
+    index = 0
+    for _ in range(change_count):
+        gap, offset = _read_varint(delta, offset)
+        index += gap
+        base.bits[index] = delta[offset]
+        offset += 1
+
+    base.item_count = item_count
+    return base.to_bytes()
@@ -0,0 +1,346 @@
+"""
+Shared response caching for the API views.
+Responses are stored in the configured Django cache (file-based by default, so all
+gunicorn workers on a host share them; Redis when REDIS_URL is set). Hit/miss
+counters are kept per process, so serving a hit never writes to the shared cache.
+
+Every key is namespaced by the dataset generation, a counter bumped whenever
+company data changes (signals, seeding, admin actions, /api/data/refresh).
+Bumping it makes all earlier entries unreachable at once, so entries can live
+for a long time and simply age out of the cache.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_response_headers, patch_vary_headers
+
+GENERATION_KEY = 'dataset:generation'
+GENERATION_LOCK_KEY = 'dataset:generation:lock'
+LOCK_POLL_INTERVAL = 0.05
+# Query parameters whose comma-separated values are sets, not sequences
+UNORDERED_LIST_PARAMS = frozenset({'fields'})
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+class CacheCounters:
+    """
+    Per-process hit/miss/stale counters for cached responses.
+    Kept in memory: incr() on the file backend is a read and a rewrite of the entry
+    (plus a scan of the cache directory), which would put a write on every hit.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, name):
+        return self._counts[name]
+
+    def reset(self):
+        """Zero every counter (used by tests)."""
+        with self._lock:
+            self._counts = Counter()
+
+
+cache_counters = CacheCounters()
+
+
+def _lock_path(cache, key):
+    return os.path.join(cache._dir, hashlib.md5(key.encode('utf-8')).hexdigest() + '.lock')
+
+
+def _create_lock_file(path):
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    except FileNotFoundError:
+        # The cache directory hasn't been created yet
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return _create_lock_file(path)
+    return True
+
+
+def acquire_lock(key, timeout):
+    """
+    Take a short lock shared by every worker; returns False when someone else holds it.
+    cache.add() is atomic on redis, db and locmem, but on the file backend it is a
+    has_key() followed by a set(), so there the lock is an O_CREAT | O_EXCL lock file
+    next to the cache entries. A lock file older than timeout is taken over.
+    """
+    cache = get_cache()
+    if not isinstance(cache, FileBasedCache):
+        return cache.add(key, 1, timeout)
+
+    path = _lock_path(cache, key)
+    if _create_lock_file(path):
+        return True
+    try:
+        expired = os.path.getmtime(path) + timeout < time.time()
+    except FileNotFoundError:
+        # Released in the meantime
+        expired = True
+    if not expired:
+        return False
+    # The holder died or overran the timeout; remove its lock and race once for a new one
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return _create_lock_file(path)
+
+
+def release_lock(key):
+    """Release a lock taken with acquire_lock()."""
+    cache = get_cache()
+    if not isinstance(cache, FileBasedCache):
+        cache.delete(key)
+        return
+    try:
+        os.remove(_lock_path(cache, key))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def _generation_lock():
+    """
+    Serialize generation bumps with reloads of the generation from the database, so a
+    stale read can't overwrite a newer bump. Waits up to API_CACHE_LOCK_WAIT seconds,
+    then proceeds without the lock.
+    """
+    deadline = time.monotonic() + settings.API_CACHE_LOCK_WAIT
+    acquired = acquire_lock(GENERATION_LOCK_KEY, settings.API_CACHE_LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        acquired = acquire_lock(GENERATION_LOCK_KEY, settings.API_CACHE_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_lock(GENERATION_LOCK_KEY)
+
+
+def get_generation():
+    """
+    Current dataset generation, read from the shared cache.
+    Falls back to the value stored on DataVersion when the cache has lost it.
+    """
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        from .models import DataVersion
+        with _generation_lock():
+            generation = cache.get(GENERATION_KEY)
+            if generation is None:
+                generation = DataVersion.current_generation()
+                # add() so a concurrent bump isn't overwritten if the lock timed out
+                if not cache.add(GENERATION_KEY, generation, settings.DATASET_GENERATION_TIMEOUT):
+                    generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def bump_generation():
+    """
+    Advance the dataset generation, invalidating every cached response and
+    in-process snapshot. Returns the new generation.
+    """
+    from .models import DataVersion
+
+    cache = get_cache()
+    with _generation_lock():
+        cached = cache.get(GENERATION_KEY) or 0
+        generation = DataVersion.bump_generation(at_least=cached + 1)
+        cache.set(GENERATION_KEY, generation, settings.DATASET_GENERATION_TIMEOUT)
+    return generation
+
+
+class _GenerationBump:
+    """on_commit callback bumping the generation; remembers whether it has run."""
+
+    def __init__(self):
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        bump_generation()
+
+
+def schedule_generation_bump(using=None):
+    """
+    Bump the dataset generation once the current transaction commits (right away in
+    autocommit mode), so other workers never rebuild snapshots or cache responses from
+    uncommitted rows. Repeated calls within one transaction register a single bump;
+    a rollback discards it.
+    """
+    connection = transaction.get_connection(using)
+    for entry in connection.run_on_commit:
+        # (savepoint ids, callback, robust); entries of rolled back savepoints are already gone
+        if isinstance(entry[1], _GenerationBump) and not entry[1].done:
+            return
+    transaction.on_commit(_GenerationBump(), using=using)
+
+
+def cache_stats():
+    """Hit/miss counters and hit ratio of this worker's cached API responses."""
+    hits = cache_counters.get('hits')
+    misses = cache_counters.get('misses')
+    total = hits + misses
+    return {
+        'backend': settings.CACHES[settings.API_CACHE_ALIAS]['BACKEND'].rsplit('.', 1)[-1],
+        'scope': 'process',
+        'hits': hits,
+        'misses': misses,
+        'staleHits': cache_counters.get('stale'),
+        'hitRatio': round(hits / total, 4) if total else None,
+        'generation': get_cache().get(GENERATION_KEY),
+    }
+
+
+def _canonical_param(key, value):
+    if key in UNORDERED_LIST_PARAMS:
+        return ','.join(sorted({item.strip() for item in value.split(',') if item.strip()}))
+    return value
+
+
+def response_cache_key(prefix, request, generation=None, variant=''):
+    """
+    Key built from the dataset generation, an optional prefix, the path, the sorted
+    query string and an optional variant (e.g. the negotiated language).
+    Comma-separated sets such as ?fields= are sorted as well, so fields=a,b and
+    fields=b,a share an entry.
+    """
+    if generation is None:
+        generation = get_generation()
+    query = urlencode(sorted(
+        (key, _canonical_param(key, value)) for key, values in request.GET.lists() for value in values
+    ))
+    digest = hashlib.md5('{}?{}#{}'.format(request.path, query, variant).encode('utf-8')).hexdigest()
+    return 'api-cache:{}:{}:{}'.format(generation, prefix, digest)
+
+
+def _cached_response(entry, client_max_age, label, vary):
+    content, content_type, _ = entry
+    response = HttpResponse(content, content_type=content_type)
+    patch_response_headers(response, client_max_age)
+    if vary:
+        patch_vary_headers(response, vary)
+    response['X-Cache'] = label
+    return response
+
+
+def _wait_for_entry(cache, key):
+    """Poll for an entry another request is computing, for at most API_CACHE_LOCK_WAIT seconds."""
+    deadline = time.monotonic() + settings.API_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cache_response(timeout=None, key_prefix='view', stale_timeout=None, variant=None, vary=()):
+    """
+    Cache successful GET/HEAD responses of a view in the shared cache.
+    A drop-in replacement for django's cache_page that also counts hits and misses (per process)
+    and marks responses with X-Cache: HIT/MISS/STALE.
+    Entries are fresh for timeout seconds (API_CACHE_TIMEOUT by default) while clients
+    are only told to cache for API_CACHE_CLIENT_MAX_AGE, so a generation bump reaches
+    them quickly.
+
+    Concurrent misses are coalesced: the request that wins a short lock (acquire_lock)
+    recomputes the entry. Meanwhile the others are served the expired entry for up to
+    stale_timeout more seconds (API_CACHE_STALE_TIMEOUT by default), or wait for the
+    winner when there is nothing to serve.
+    
+    Responses that depend on request headers pass variant, a function of the request
+    whose result becomes part of the key (e.g. the language picked from Accept-Language,
+    rather than the raw header), and list those headers in vary.
+    Works on function views and, through method_decorator, on class-based dispatch.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            cache = get_cache()
+            fresh_timeout = timeout or settings.API_CACHE_TIMEOUT
+            grace = settings.API_CACHE_STALE_TIMEOUT if stale_timeout is None else stale_timeout
+            client_max_age = min(fresh_timeout, settings.API_CACHE_CLIENT_MAX_AGE)
+            key = response_cache_key(key_prefix, request, variant=variant(request) if variant else '')
+            lock_key = key + ':lock'
+
+            entry = cache.get(key)
+            if entry is not None and entry[2] > time.time():
+                cache_counters.incr('hits')
+                return _cached_response(entry, client_max_age, 'HIT', vary)
+
+            if not acquire_lock(lock_key, settings.API_CACHE_LOCK_TIMEOUT):
+                # Someone else is recomputing this entry
+                if entry is not None:
+                    cache_counters.incr('hits')
+                    cache_counters.incr('stale')
+                    return _cached_response(entry, client_max_age, 'STALE', vary)
+                entry = _wait_for_entry(cache, key)
+                if entry is not None:
+                    cache_counters.incr('hits')
+                    return _cached_response(entry, client_max_age, 'HIT', vary)
+                # The other request is taking too long; compute without the lock
+                lock_key = None
+
+            def release():
+                if lock_key is not None:
+                    release_lock(lock_key)
+
+            cache_counters.incr('misses')
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                release()
+                raise
+            response['X-Cache'] = 'MISS'
+            if response.status_code != 200 or response.streaming:
+                release()
+                return response
+
+            patch_response_headers(response, client_max_age)
+            if vary:
+                patch_vary_headers(response, vary)
+
+            def store(rendered):
+                entry = (rendered.content, rendered['Content-Type'], time.time() + fresh_timeout)
+                cache.set(key, entry, fresh_timeout + grace)
+                release()
+
+            if hasattr(response, 'render') and callable(response.render) and not response.is_rendered:
+                # DRF responses are rendered after the view returns
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+            return response
+
+        return wrapped
+
+    return decorator
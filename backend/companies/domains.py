@@ -0,0 +1,123 @@
+"""
+Domain helpers shared by the models, views and lookup indexes.
+"""
+
+
+def normalize_domain(domain):
+    """
+    Normalize a domain for matching (lowercase, no surrounding whitespace,
+    no trailing dot and no leading www.).
+    Returns an empty string for empty input.
+    """
+    if not domain:
+        return ''
+
+    normalized = domain.strip().lower().rstrip('.')
+    if normalized.startswith('www.'):
+        normalized = normalized[4:]
+    return normalized
+
+
+# Multi-label public suffixes we see in the dataset and in extension traffic.
+# Every single-label TLD (com, tr, de, ...) is treated as a public suffix as well.
+PUBLIC_SUFFIXES = frozenset([
+    # Turkey
+    'com.tr', 'net.tr', 'org.tr', 'gen.tr', 'biz.tr', 'info.tr', 'web.tr',
+    'tv.tr', 'av.tr', 'dr.tr', 'bel.tr', 'pol.tr', 'tsk.tr', 'edu.tr',
+    'gov.tr', 'k12.tr', 'name.tr', 'bbs.tr', 'tel.tr', 'kep.tr',
+    # United Kingdom
+    'co.uk', 'org.uk', 'me.uk', 'ltd.uk', 'plc.uk', 'net.uk', 'ac.uk', 'gov.uk',
+    # Other common second-level registries
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp',
+    'co.kr', 'or.kr', 'co.nz', 'org.nz', 'co.za', 'org.za', 'co.in', 'org.in',
+    'co.il', 'org.il', 'co.id', 'co.th', 'com.br', 'net.br', 'org.br',
+    'com.cn', 'net.cn', 'org.cn', 'com.hk', 'com.tw', 'com.sg', 'com.my',
+    'com.mx', 'com.ar', 'com.co', 'com.pe', 'com.ua', 'com.pl', 'com.cy',
+    'com.eg', 'com.sa', 'com.pk', 'com.ng', 'com.vn', 'com.ph', 'com.az',
+    'gv.at', 'co.at', 'or.at',
+])
+
+
+def is_public_suffix(domain):
+    """True if the normalized domain is a bare TLD or a known public suffix."""
+    return '.' not in domain or domain in PUBLIC_SUFFIXES
+
+
+def registrable_domain(domain):
+    """
+    Return the registrable part of a normalized domain (public suffix plus one label),
+    e.g. shop.unilever.com.tr → unilever.com.tr. Returns the domain itself if it is
+    already registrable or has no registrable part.
+    """
+    candidates = candidate_domains(domain)
+    return candidates[-1] if candidates else domain
+
+
+def candidate_domains(domain):
+    """
+    The normalized domain and each parent domain that is not a public suffix,
+    longest first: mail.google.com → ['mail.google.com', 'google.com'].
+    """
+    labels = domain.split('.') if domain else []
+    candidates = []
+    for i in range(len(labels)):
+        candidate = '.'.join(labels[i:])
+        if is_public_suffix(candidate):
+            break
+        candidates.append(candidate)
+    return candidates
+
+
+class DomainTrie:
+    """
+    Trie over reversed domain labels (com → google → mail).
+    resolve() walks a lookup domain label by label and returns the longest
+    indexed suffix in O(labels). Public suffixes are never stored, so com.tr
+    can't match on its own.
+    """
+
+    _VALUE = None  # Key holding a node's value; labels are always strings
+
+    def __init__(self):
+        self._root = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, domain, value):
+        """Index a normalized domain. Returns False for public suffixes."""
+        if not domain or is_public_suffix(domain):
+            return False
+
+        node = self._root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        if self._VALUE not in node:
+            self._size += 1
+        node[self._VALUE] = value
+        return True
+
+    def resolve(self, domain):
+        """
+        Return (matched_domain, value) for the longest indexed suffix of the
+        normalized domain, or None.
+        """
+        if not domain:
+            return None
+
+        labels = domain.split('.')
+        node = self._root
+        match = None
+        for depth, label in enumerate(reversed(labels), start=1):
+            node = node.get(label)
+            if node is None:
+                break
+            if self._VALUE in node:
+                match = (depth, node[self._VALUE])
+
+        if match is None:
+            return None
+        depth, value = match
+        return '.'.join(labels[-depth:]), value
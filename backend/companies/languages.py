@@ -0,0 +1,82 @@
+"""
+Language selection for the multilingual company description.
+Company.description holds one text per language ({'tr': ..., 'en': ..., 'de': ...});
+detail responses can be limited to a single language with ?lang= or Accept-Language.
+"""
+
+from functools import lru_cache
+
+DESCRIPTION_LANGUAGES = ('en', 'tr', 'de')
+# Tried in order when the requested language has no text
+FALLBACK_LANGUAGES = ('en', 'tr')
+# ?lang=all (or no language preference at all) keeps every translation
+ALL_LANGUAGES = 'all'
+LANGUAGE_QUERY_PARAM = 'lang'
+
+
+def _primary_subtag(tag):
+    return tag.strip().split('-', 1)[0].split('_', 1)[0].lower()
+
+
+@lru_cache(maxsize=256)
+def language_from_header(header):
+    """
+    Best supported language of an Accept-Language header, by quality value.
+    Returns the first fallback language when none of the listed ones is supported.
+    """
+    ranked = []
+    for position, item in enumerate(header.split(',')):
+        tag, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if quality > 0:
+            ranked.append((-quality, position, _primary_subtag(tag)))
+    for _, _, language in sorted(ranked):
+        if language in DESCRIPTION_LANGUAGES:
+            return language
+    return FALLBACK_LANGUAGES[0]
+
+
+def request_language(request):
+    """
+    Description language requested by a Django request: ?lang= first, then Accept-Language.
+    Returns ALL_LANGUAGES when the client expressed no preference.
+    Unsupported languages resolve through the fallback chain when the description is selected.
+    """
+    value = request.GET.get(LANGUAGE_QUERY_PARAM, '').strip()
+    if value:
+        language = _primary_subtag(value)
+        return language if language == ALL_LANGUAGES or language in DESCRIPTION_LANGUAGES else FALLBACK_LANGUAGES[0]
+    header = request.META.get('HTTP_ACCEPT_LANGUAGE', '').strip()
+    if header:
+        return language_from_header(header)
+    return ALL_LANGUAGES
+
+
+def select_description(description, language):
+    """
+    Keep only one language of a description dict: the requested one, else the first
+    fallback language that has text. Returns {} when none of them has text.
+    Non-dict descriptions and ALL_LANGUAGES are returned unchanged.
+    """
+    if language == ALL_LANGUAGES or not isinstance(description, dict):
+        return description
+    for code in (language,) + FALLBACK_LANGUAGES:
+        text = description.get(code)
+        if text:
+            return {code: text}
+    return {}
+
+
+def localize_payload(payload, language):
+    """Copy of a serialized company payload with its description narrowed to one language."""
+    if language == ALL_LANGUAGES or 'description' not in payload:
+        return payload
+    localized = dict(payload)
+    localized['description'] = select_description(payload['description'], language)
+    return localized
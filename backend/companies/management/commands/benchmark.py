@@ -0,0 +1,362 @@
+"""
+Django management command to benchmark hot code paths against the configured database.
+Usage: python manage.py benchmark miss-path [--threads 8] [--requests 200] [--domains 20]
+       python manage.py benchmark serializers [--requests 200] [--rows 1000]
+       python manage.py benchmark fuzzy-search [--requests 200] [--rows 100000]
+       python manage.py benchmark suggest [--requests 200] [--rows 100000]
+
+Run it against PostgreSQL (or a file-based SQLite database); benchmark rows are removed afterwards.
+"""
+
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, IntegrityError, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from companies.models import Company, CompanyRequest
+from companies.names import name_key
+from companies.search import TrigramIndex, similar_companies, trigrams, use_database_search
+from companies.suggest import normalize_prefix, suggest_index
+from companies.serializers import (
+    CompanyListRowSerializer,
+    CompanyListSerializer,
+    CompanySearchRowSerializer,
+    CompanySearchSerializer,
+)
+from companies.telemetry import miss_buffer
+from companies.views import company_suggest_view
+
+
+class Command(BaseCommand):
+    help = 'Benchmark hot code paths (latency percentiles and throughput)'
+
+    SUITES = {
+        'miss-path': 'bench_miss_path',
+        'serializers': 'bench_serializers',
+        'fuzzy-search': 'bench_fuzzy_search',
+        'suggest': 'bench_suggest',
+    }
+    
+    # Word pools for synthetic company names in bench_fuzzy_search
+    NAME_WORDS = [
+        'Anadolu', 'Ege', 'Marmara', 'Karadeniz', 'Yeşil', 'Güneş', 'Rüzgar', 'Enerji', 'Gıda',
+        'Tekstil', 'İnşaat', 'Otomotiv', 'Kimya', 'Lojistik', 'Teknoloji', 'Sigorta', 'Çelik',
+        'Nordic', 'Global', 'Green', 'Solar', 'Systems', 'Foods', 'Motors', 'Werke', 'Technik',
+        'Bau', 'Handel', 'Logistik', 'Pharma', 'Medya', 'Turizm', 'Tarım', 'Madencilik', 'Elektrik',
+    ]
+    NAME_SUFFIXES = ['A.Ş.', 'Ltd. Şti.', 'GmbH', 'AG', 'Inc.', 'Holding', 'Group', '']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suite',
+            choices=sorted(self.SUITES),
+            help='Which benchmark to run'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Number of concurrent workers (default: 8)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Operations per worker (default: 200)'
+        )
+        parser.add_argument(
+            '--domains',
+            type=int,
+            default=20,
+            help='Number of distinct hot domains for miss-path (default: 20)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Companies per serialized page for serializers, dataset size for fuzzy-search and suggest (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        getattr(self, self.SUITES[options['suite']])(options)
+
+    def report(self, label, latencies, elapsed, extra=''):
+        """Print percentiles (ms) and throughput for one benchmark variant."""
+        latencies = sorted(latencies)
+        if not latencies:
+            self.stdout.write(f"{label:<28} no samples")
+            return
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{label:<28} p50 {percentile(0.50):7.2f} ms  p95 {percentile(0.95):7.2f} ms  "
+            f"p99 {percentile(0.99):7.2f} ms  mean {statistics.mean(latencies) * 1000:7.2f} ms  "
+            f"{len(latencies) / elapsed:8.0f} ops/s  {extra}"
+        )
+
+    def run_concurrently(self, operation, items, threads, per_thread):
+        """Run operation(item) per_thread times on each of threads workers. Returns (latencies, errors, elapsed)."""
+
+        def worker(offset):
+            latencies, errors = [], 0
+            try:
+                for i in range(per_thread):
+                    item = items[(offset + i) % len(items)]
+                    started = time.perf_counter()
+                    try:
+                        operation(item)
+                    except IntegrityError:
+                        errors += 1
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for thread_latencies, _ in results for latency in thread_latencies]
+        errors = sum(thread_errors for _, thread_errors in results)
+        return latencies, errors, elapsed
+
+    @staticmethod
+    def legacy_record_request(domain):
+        """The previous get_or_create + read-modify-write implementation, kept for comparison."""
+        request, created = CompanyRequest.objects.get_or_create(
+            domain=domain,
+            defaults={'request_count': 1, 'status': CompanyRequest.Status.PENDING}
+        )
+        if not created:
+            request.request_count += 1
+            request.last_requested_at = timezone.now()
+            request.save(update_fields=['request_count', 'last_requested_at', 'updated_at'])
+
+    def bench_miss_path(self, options):
+        """Concurrent CompanyRequest recording for a handful of hot unknown domains."""
+        threads, per_thread = options['threads'], options['requests']
+        domains = [f'bench-miss-{i}.example' for i in range(max(1, options['domains']))]
+        expected = threads * per_thread
+
+        self.stdout.write(
+            f"miss-path: {threads} workers × {per_thread} requests over {len(domains)} domains "
+            f"({connection.vendor})"
+        )
+
+        variants = [
+            ('get_or_create + save', self.legacy_record_request),
+            ('upsert (record_request)', CompanyRequest.record_request),
+            ('write-behind buffer', lambda domain: miss_buffer.record([domain])),
+        ]
+        try:
+            for label, operation in variants:
+                CompanyRequest.objects.filter(domain__in=domains).delete()
+                latencies, errors, elapsed = self.run_concurrently(operation, domains, threads, per_thread)
+                miss_buffer.flush()
+                recorded = sum(CompanyRequest.objects.filter(domain__in=domains).values_list('request_count', flat=True))
+                self.report(label, latencies, elapsed, f"lost {expected - recorded}  errors {errors}")
+        finally:
+            CompanyRequest.objects.filter(domain__in=domains).delete()
+
+    def time_operation(self, operation, iterations):
+        """Run operation serially. Returns (latencies, elapsed)."""
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            operation_started = time.perf_counter()
+            operation()
+            latencies.append(time.perf_counter() - operation_started)
+        return latencies, time.perf_counter() - started
+
+    def bench_serializers(self, options):
+        """DRF ModelSerializers vs the values() row serializers, query + serialize + render of one page."""
+        rows, iterations = options['rows'], options['requests']
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            # Top up with synthetic companies; rolled back at the end
+            missing = rows - Company.objects.count()
+            if missing > 0:
+                Company.objects.bulk_create([
+                    Company(
+                        company=f'Bench Company {i:06d}',
+                        name_key=name_key(f'Bench Company {i:06d}'),
+                        domains=[f'bench-{i}.example', f'www.bench-{i}.example'],
+                        carbon_neutral=i % 3 == 0,
+                        renewable_share_percent=(i % 100) or None,
+                        origin=['TR', 'DE', 'US', None][i % 4],
+                        sector='Technology',
+                    )
+                    for i in range(missing)
+                ], batch_size=1000)
+
+            self.stdout.write(f"serializers: {rows} rows per page × {iterations} pages ({connection.vendor})")
+
+            pairs = [
+                ('list', CompanyListSerializer, CompanyListRowSerializer),
+                ('search', CompanySearchSerializer, CompanySearchRowSerializer),
+            ]
+            for name, model_serializer, row_serializer in pairs:
+                def model_page():
+                    queryset = Company.objects.order_by('company', 'id')[:rows]
+                    return renderer.render(model_serializer(queryset, many=True).data)
+
+                def row_page():
+                    queryset = row_serializer.values(Company.objects.order_by('company', 'id'))[:rows]
+                    return renderer.render(row_serializer(queryset, many=True).data)
+
+                if model_page() != row_page():
+                    raise CommandError(f"{row_serializer.__name__} output differs from {model_serializer.__name__}")
+
+                for label, operation in [(model_serializer.__name__, model_page), (row_serializer.__name__, row_page)]:
+                    latencies, elapsed = self.time_operation(operation, iterations)
+                    self.report(label, latencies, elapsed, f"{rows * iterations / elapsed:10.0f} rows/s")
+
+            transaction.set_rollback(True)
+
+    @classmethod
+    def synthetic_name(cls, rng):
+        """A made-up brand followed by a few sector words and a legal suffix."""
+        brand = ''.join(
+            rng.choice('bcçdfgğhklmnprsştvyz') + rng.choice('aeıioöuü') for _ in range(rng.randrange(2, 5))
+        ).capitalize()
+        words = rng.sample(cls.NAME_WORDS, rng.randrange(0, 3))
+        return ' '.join(filter(None, [brand, *words, rng.choice(cls.NAME_SUFFIXES)]))
+
+    @staticmethod
+    def misspell(name, rng):
+        """Drop, double or swap one character, or strip the accents, like a hurried user would."""
+        chars = list(name)
+        position = rng.randrange(1, len(chars) - 1)
+        edit = rng.randrange(4)
+        if edit == 0:
+            del chars[position]
+        elif edit == 1:
+            chars.insert(position, chars[position])
+        elif edit == 2:
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        else:
+            chars = list(name.translate(str.maketrans('çğıİöşüÇĞÖŞÜ', 'cgiIosuCGOSU')))
+        return ''.join(chars)
+
+    def bench_fuzzy_search(self, options):
+        """Typo-tolerant name search: icontains vs trigram similarity (brute force, index, pg_trgm)."""
+        rows, iterations = options['rows'], options['requests']
+        limit, threshold = settings.SEARCH_FUZZY_LIMIT, settings.SEARCH_FUZZY_THRESHOLD
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            # Top up with synthetic companies; rolled back at the end
+            missing = rows - Company.objects.count()
+            if missing > 0:
+                Company.objects.bulk_create([
+                    Company(company=name, name_key=name_key(name), domains=[])
+                    for name in (self.synthetic_name(rng) for _ in range(missing))
+                ], batch_size=2000)
+
+            names = dict(Company.objects.values_list('id', 'company'))
+            targets = rng.sample(sorted(names), min(iterations, len(names)))
+            queries = [(company_id, self.misspell(names[company_id], rng)) for company_id in targets]
+
+            started = time.perf_counter()
+            index = TrigramIndex.build(stamp=0, generation=0)
+            self.stdout.write(
+                f"fuzzy-search: {len(names)} companies, {len(queries)} misspelt queries, top {limit} "
+                f"at similarity >= {threshold} ({connection.vendor}); "
+                f"trigram index built in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+
+            name_trigrams = {company_id: trigrams(name) for company_id, name in names.items()}
+
+            def brute_force(query):
+                grams = trigrams(query)
+                scored = []
+                for company_id, other in name_trigrams.items():
+                    shared = len(grams & other)
+                    similarity = shared / (len(grams) + len(other) - shared) if shared else 0
+                    if similarity >= threshold:
+                        scored.append((-similarity, names[company_id], company_id))
+                return [company_id for _, _, company_id in sorted(scored)[:limit]]
+
+            variants = [
+                ('icontains (previous)', lambda query: list(
+                    Company.objects.filter(company__icontains=query).values_list('id', flat=True)[:limit]
+                )),
+                ('trigram scan (python)', brute_force),
+                ('trigram index (memory)', lambda query: [
+                    company_id for company_id, _ in index.search(query, limit, threshold)
+                ]),
+            ]
+            if use_database_search():
+                variants.append(('pg_trgm GIN', lambda query: list(
+                    similar_companies(Company.objects.all(), query).values_list('id', flat=True)[:limit]
+                )))
+
+            for label, search in variants:
+                found = 0
+                latencies = []
+                started = time.perf_counter()
+                for company_id, query in queries:
+                    query_started = time.perf_counter()
+                    results = search(query)
+                    latencies.append(time.perf_counter() - query_started)
+                    found += company_id in results
+                self.report(label, latencies, time.perf_counter() - started, f"found {found}/{len(queries)}")
+
+            transaction.set_rollback(True)
+
+    def bench_suggest(self, options):
+        """Per-keystroke suggestion latency: the index lookup alone and the whole view."""
+        rows, iterations = options['rows'], options['requests']
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            # Top up with synthetic companies; rolled back at the end
+            missing = rows - Company.objects.count()
+            if missing > 0:
+                Company.objects.bulk_create([
+                    Company(company=name, name_key=name_key(name), domains=[])
+                    for name in (self.synthetic_name(rng) for _ in range(missing))
+                ], batch_size=2000)
+
+            names = list(Company.objects.values_list('company', flat=True))
+            # Every keystroke of a few typed names: 1, 2, 3 ... characters
+            keystrokes = []
+            while len(keystrokes) < iterations:
+                name = rng.choice(names)
+                keystrokes.extend(name[:length] for length in range(1, min(len(name), 12) + 1))
+            keystrokes = keystrokes[:iterations]
+
+            try:
+                # The worker's own index, built from the topped-up rows inside this transaction
+                index = suggest_index.refresh(force=True)
+                self.stdout.write(
+                    f"suggest: {len(names)} companies, {len(index)} keys, {len(keystrokes)} keystrokes "
+                    f"({connection.vendor}); index built in {index.build_seconds * 1000:.0f} ms"
+                )
+
+                limit = settings.SUGGEST_DEFAULT_LIMIT
+                prefixes = iter(keystrokes)
+                latencies, elapsed = self.time_operation(
+                    lambda: index.suggest(normalize_prefix(next(prefixes)), limit), len(keystrokes)
+                )
+                self.report('index lookup', latencies, elapsed)
+
+                factory = RequestFactory()
+                requests = iter([factory.get('/api/companies/suggest', {'prefix': prefix}) for prefix in keystrokes])
+                latencies, elapsed = self.time_operation(lambda: company_suggest_view(next(requests)), len(keystrokes))
+                self.report('view (lookup + JSON)', latencies, elapsed)
+            finally:
+                suggest_index.reset()
+
+            transaction.set_rollback(True)
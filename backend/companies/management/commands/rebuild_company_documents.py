@@ -0,0 +1,36 @@
+"""
+Django management command to re-render the stored JSON document of every company.
+Usage: python manage.py rebuild_company_documents [--batch-size 500]
+
+Documents are kept current by signals; run this after migrating, after raw
+imports (loaddata) or after changing CompanySerializer.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from companies.cache import bump_generation
+from companies.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Re-render the pre-computed JSON document of every company'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of companies rendered and written per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = Company.refresh_documents(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        bump_generation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} company documents in {elapsed:.1f} s ({written / elapsed if elapsed else 0:.0f}/s)"
+        ))
@@ -8,7 +8,10 @@ import os
 from datetime import datetime
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from companies.models import Company, DataVersion
+from django.utils import timezone
+from companies.cache import bump_generation
+from companies.models import Company, CompanyDomain, DataVersion
+from companies.names import name_key
 
 
 class Command(BaseCommand):
@@ -55,11 +58,13 @@ class Command(BaseCommand):
             raise CommandError(f'Data directory does not exist: {directory_path}')
         
         # Clear existing data if requested
+        previous_generation = DataVersion.current_generation()
         if clear_data:
             self.stdout.write(self.style.WARNING('Clearing existing company data...'))
-            Company.objects.all().delete()
+            # Bulk delete without per-row signals; the generation is bumped once below
+            deleted = Company.delete_all(batch_size=batch_size)
             DataVersion.objects.all().delete()
-            self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
+            self.stdout.write(self.style.SUCCESS(f'Existing data cleared ({deleted} companies).'))
         
         json_files = [f for f in os.listdir(directory_path) if f.endswith('.json')]
         if not json_files:
@@ -97,6 +102,7 @@ class Command(BaseCommand):
         error_count = 0
         skipped_companies = []  # Track skipped companies for report
         
+        seed_started = timezone.now()
         with transaction.atomic():
             companies_to_create = []
             
@@ -134,12 +140,12 @@ class Command(BaseCommand):
                     existing_company = None
                     if domains_list:
                         for domain in domains_list:
-                            existing_company = Company.find_by_domain(domain)
+                            existing_company = Company.find_by_domain(domain, include_parents=False)
                             if existing_company:
                                 break
                     else:
                         # If no domains, use company name for uniqueness check
-                        existing_company = Company.objects.filter(company__iexact=company_name, domains=[]).first()
+                        existing_company = Company.objects.filter(name_key=name_key(company_name), domains=[]).first()
                     
                     # Prepare description - can be a dict with language keys or a string
                     description_data = company_data.get('description')
@@ -202,6 +208,8 @@ class Command(BaseCommand):
                     company = Company(
                         domains=domains_list,
                         company=company_name,
+                        # bulk_create skips save(), which fills the key for single saves
+                        name_key=name_key(company_name),
                         carbon_neutral=company_data.get('carbon_neutral', False),
                         renewable_share_percent=company_data.get('renewable_share_percent'),
                         parent=company_data.get('parent'),
@@ -218,7 +226,9 @@ class Command(BaseCommand):
                     
                     # Batch create when we reach batch_size
                     if len(companies_to_create) >= batch_size:
-                        Company.objects.bulk_create(companies_to_create, ignore_conflicts=True)
+                        Company.objects.bulk_create(companies_to_create)
+                        CompanyDomain.index_companies(companies_to_create)
+                        Company.refresh_documents(company.pk for company in companies_to_create)
                         created_count += len(companies_to_create)
                         companies_to_create = []
                         
@@ -235,8 +245,15 @@ class Command(BaseCommand):
             
             # Create remaining companies
             if companies_to_create:
-                Company.objects.bulk_create(companies_to_create, ignore_conflicts=True)
+                Company.objects.bulk_create(companies_to_create)
+                CompanyDomain.index_companies(companies_to_create)
+                Company.refresh_documents(company.pk for company in companies_to_create)
                 created_count += len(companies_to_create)
+            
+            # The rows only become visible at commit, long after their save-time updated_at
+            # for large files; restamp them now so change feed clients that already polled
+            # past those timestamps (CHANGE_FEED_LAG covers only a few seconds) still see them
+            Company.objects.filter(updated_at__gte=seed_started).update(updated_at=timezone.now())
         
         # Create/update data version
         version, version_created = DataVersion.objects.get_or_create(
@@ -246,9 +263,12 @@ class Command(BaseCommand):
                 'carbon_neutral_count': 0,
                 'renewable_data_count': 0,
                 'public_companies_count': 0,
+                # Never reuse a generation, even after --clear
+                'generation': previous_generation,
             }
         )
         version.update_counts()
+        generation = bump_generation()
         
         # Summary
         self.stdout.write("\n" + "="*50)
@@ -264,6 +284,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS("Created data version 1.0.0"))
         else:
             self.stdout.write(self.style.SUCCESS("Updated data version statistics"))
+        self.stdout.write(f"Dataset generation: {generation} (cached API responses invalidated)")
         
         # Show some stats
         carbon_neutral = Company.objects.filter(carbon_neutral=True).count()
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_domain_index(apps, schema_editor):
+    """Build CompanyDomain rows from existing Company.domains arrays."""
+    Company = apps.get_model('companies', 'Company')
+    CompanyDomain = apps.get_model('companies', 'CompanyDomain')
+
+    entries = []
+    seen = set()
+    for company_id, domains in Company.objects.order_by('company', 'id').values_list('id', 'domains').iterator():
+        for domain in domains or []:
+            normalized = domain.strip().lower().rstrip('.')
+            if normalized.startswith('www.'):
+                normalized = normalized[4:]
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            entries.append(CompanyDomain(domain=normalized, company_id=company_id))
+
+    CompanyDomain.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0008_add_documents_and_dates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyDomain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(help_text='Normalized domain (lowercase, without www.)', max_length=255, unique=True)),
+                ('company', models.ForeignKey(help_text='The company owning this domain', on_delete=django.db.models.deletion.CASCADE, related_name='domain_entries', to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Company Domain',
+                'verbose_name_plural': 'Company Domains',
+                'ordering': ['domain'],
+            },
+        ),
+        migrations.RunPython(populate_domain_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0009_add_company_domain_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='generation',
+            field=models.PositiveBigIntegerField(default=0, help_text='Dataset generation; bumped on every data change to invalidate caches'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0010_add_dataversion_generation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['company', 'id'], name='company_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0011_add_company_name_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_id', models.BigIntegerField(help_text='Id of the deleted company')),
+                ('company', models.CharField(help_text='Company name at deletion time', max_length=255)),
+                ('domains', models.JSONField(blank=True, default=list, help_text='Domains the company had at deletion time')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Company Tombstone',
+                'verbose_name_plural': 'Company Tombstones',
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['updated_at', 'id'], name='company_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='companytombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ),
+    ]
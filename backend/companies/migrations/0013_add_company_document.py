@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0012_add_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='document',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Pre-rendered JSON document served by the domain endpoint'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:06
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models.fields.json import KeyTextTransform
+
+# Same expression as companies.search.search_vector()
+TEXT_SEARCH_CONFIGS = {'tr': 'turkish', 'en': 'english', 'de': 'german'}
+
+
+def create_search_index(apps, schema_editor):
+    """GIN index and initial vectors; full-text search only runs in the database on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS company_search_vector_idx '
+        'ON companies_company USING gin (search_vector)'
+    )
+    vector = SearchVector('company', config='simple', weight='A')
+    for language, config in TEXT_SEARCH_CONFIGS.items():
+        vector = vector + SearchVector(KeyTextTransform(language, 'description'), config=config, weight='B')
+    Company = apps.get_model('companies', 'Company')
+    Company.objects.using(schema_editor.connection.alias).update(search_vector=vector)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS company_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0013_add_company_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Full-text search vector of the name and descriptions (PostgreSQL)', null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:20
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    """pg_trgm GIN index for fuzzy name search; other databases use the in-memory trigram index."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS company_name_trgm_idx '
+        'ON companies_company USING gin (company gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS company_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0014_add_company_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:16
+
+from django.db import migrations, models
+
+
+def populate_reversed_domains(apps, schema_editor):
+    """Fill reversed_domain for existing index rows."""
+    CompanyDomain = apps.get_model('companies', 'CompanyDomain')
+
+    batch = []
+    for entry in CompanyDomain.objects.only('id', 'domain').iterator(chunk_size=2000):
+        entry.reversed_domain = entry.domain[::-1]
+        batch.append(entry)
+        if len(batch) >= 1000:
+            CompanyDomain.objects.bulk_update(batch, ['reversed_domain'])
+            batch = []
+    if batch:
+        CompanyDomain.objects.bulk_update(batch, ['reversed_domain'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0015_add_company_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companydomain',
+            name='reversed_domain',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='The domain spelled backwards, for suffix matching', max_length=255),
+        ),
+        migrations.RunPython(populate_reversed_domains, migrations.RunPython.noop),
+    ]
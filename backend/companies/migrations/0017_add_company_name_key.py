@@ -0,0 +1,82 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:20
+
+import unicodedata
+
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models.fields.json import KeyTextTransform
+
+# Same expression as companies.search.search_vector()
+TEXT_SEARCH_CONFIGS = {'tr': 'turkish', 'en': 'english', 'de': 'german'}
+
+
+def name_key(name):
+    """Same folding as companies.names.name_key()."""
+    if not name:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char)).replace('ı', 'i')
+    return ' '.join(folded.split())[:255]
+
+
+def populate_name_keys(apps, schema_editor):
+    """Fill name_key for existing companies."""
+    Company = apps.get_model('companies', 'Company')
+
+    batch = []
+    for company in Company.objects.only('id', 'company').iterator(chunk_size=2000):
+        company.name_key = name_key(company.company)
+        batch.append(company)
+        if len(batch) >= 1000:
+            Company.objects.bulk_update(batch, ['name_key'])
+            batch = []
+    if batch:
+        Company.objects.bulk_update(batch, ['name_key'])
+
+
+def _rebuild_search_vectors(apps, schema_editor, name_column):
+    vector = SearchVector(name_column, config='simple', weight='A')
+    for language, config in TEXT_SEARCH_CONFIGS.items():
+        vector = vector + SearchVector(KeyTextTransform(language, 'description'), config=config, weight='B')
+    Company = apps.get_model('companies', 'Company')
+    Company.objects.using(schema_editor.connection.alias).update(search_vector=vector)
+
+
+def move_name_indexes(apps, schema_editor):
+    """Move the pg_trgm index and the name part of the search vector from company to name_key."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS company_name_key_trgm_idx '
+        'ON companies_company USING gin (name_key gin_trgm_ops)'
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS company_name_trgm_idx')
+    _rebuild_search_vectors(apps, schema_editor, 'name_key')
+
+
+def restore_name_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS company_name_trgm_idx '
+        'ON companies_company USING gin (company gin_trgm_ops)'
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS company_name_key_trgm_idx')
+    _rebuild_search_vectors(apps, schema_editor, 'company')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0016_add_companydomain_reversed_domain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Case-folded, accent-stripped company name used for matching', max_length=255),
+        ),
+        migrations.RunPython(populate_name_keys, migrations.RunPython.noop),
+        migrations.RunPython(move_name_indexes, restore_name_indexes),
+    ]
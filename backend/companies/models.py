@@ -1,8 +1,15 @@
-from django.db import models
+from collections import Counter
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import F, Max
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django_countries.fields import CountryField
 
+from .domains import candidate_domains, normalize_domain, registrable_domain
+from .names import NAME_KEY_MAX_LENGTH, name_key
+
 
 class Company(models.Model):
     """
@@ -21,6 +28,13 @@ class Company(models.Model):
         db_index=True,
         help_text="Company name"
     )
+    name_key = models.CharField(
+        max_length=NAME_KEY_MAX_LENGTH,
+        db_index=True,
+        default='',
+        editable=False,
+        help_text="Case-folded, accent-stripped company name used for matching"
+    )
     
     # Sustainability metrics
     carbon_neutral = models.BooleanField(
@@ -101,6 +115,22 @@ class Company(models.Model):
         help_text="Carbon neutral alternatives for this company"
     )
     
+    # Denormalized detail response (CompanySerializer output as JSON), kept current by signals
+    document = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        help_text="Pre-rendered JSON document served by the domain endpoint"
+    )
+    
+    # Full-text search vector (name + tr/en/de descriptions), PostgreSQL only; kept current
+    # with the document. Its GIN index is created by migration 0014 on PostgreSQL.
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text="Full-text search vector of the name and descriptions (PostgreSQL)"
+    )
+    
     # Tracking fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -115,6 +145,10 @@ class Company(models.Model):
             models.Index(fields=['parent']),
             models.Index(fields=['origin']),
             models.Index(fields=['is_approved']),
+            # Keyset pagination on GET /api/companies?pagination=cursor
+            models.Index(fields=['company', 'id'], name='company_name_id_idx'),
+            # Change feed scan on GET /api/companies/changes
+            models.Index(fields=['updated_at', 'id'], name='company_updated_id_idx'),
         ]
     
     def __str__(self):
@@ -137,11 +171,10 @@ class Company(models.Model):
         Returns list of normalized domains.
         """
         normalized = []
-        for domain in self.domains:
-            normalized_domain = domain.lower()
-            if normalized_domain.startswith('www.'):
-                normalized_domain = normalized_domain[4:]
-            normalized.append(normalized_domain)
+        for domain in self.domains or []:
+            normalized_domain = normalize_domain(domain)
+            if normalized_domain and normalized_domain not in normalized:
+                normalized.append(normalized_domain)
         return normalized
     
     @property
@@ -149,39 +182,295 @@ class Company(models.Model):
         """Get the first domain as primary domain for compatibility."""
         return self.domains[0] if self.domains else None
     
+    def save(self, *args, **kwargs):
+        """
+        Save the company, keeping its name key and the normalized domain index in sync.
+        Runs in one transaction, so the dataset generation bump (on commit) comes after
+        the domain index and the stored documents are written.
+        """
+        self.name_key = name_key(self.company)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'company' in update_fields and 'name_key' not in update_fields:
+            kwargs['update_fields'] = update_fields = list(update_fields) + ['name_key']
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if update_fields is None or 'domains' in update_fields:
+                self.sync_domain_index()
+    
+    def sync_domain_index(self):
+        """
+        Bring this company's CompanyDomain rows in line with its domains array.
+        Domains already claimed by another company are left with their owner.
+        """
+        wanted = set(self.get_normalized_domains())
+        CompanyDomain.objects.filter(company=self).exclude(domain__in=wanted).delete()
+        if wanted:
+            CompanyDomain.objects.bulk_create(
+                [CompanyDomain.entry(domain, company=self) for domain in wanted],
+                ignore_conflicts=True
+            )
+    
+    @staticmethod
+    def prefetch_alternatives():
+        """
+        Prefetch used by CompanySerializer: loads the alternatives of every company in
+        a queryset with one query into `prefetched_alternatives`.
+        """
+        return models.Prefetch(
+            'alternative_relationships',
+            queryset=CompanyAlternative.objects.select_related('to_company').order_by('-relevance_score'),
+            to_attr='prefetched_alternatives',
+        )
+    
+    @classmethod
+    def find_by_domain(cls, domain, include_parents=True, only=None):
+        """
+        Find company by domain using the normalized domain index.
+        With include_parents, subdomains resolve to the longest indexed parent
+        domain (mail.google.com → google.com), never to a bare public suffix.
+        Either way this is a single indexed query; `only` limits the company columns loaded.
+        """
+        normalized_domain = normalize_domain(domain)
+        if not normalized_domain:
+            return None
+        
+        entries = CompanyDomain.objects.select_related('company')
+        if only is not None:
+            entries = entries.only('domain', 'company__id', *('company__' + column for column in only))
+        
+        if not include_parents:
+            entry = entries.filter(domain=normalized_domain).first()
+            return entry.company if entry else None
+        
+        candidates = candidate_domains(normalized_domain)
+        if not candidates:
+            return None
+        
+        entries = entries.filter(domain__in=candidates)
+        best = max(entries, key=lambda entry: len(entry.domain), default=None)
+        return best.company if best else None
+    
     @classmethod
-    def find_by_domain(cls, domain):
+    def find_document_by_domain(cls, domain):
         """
-        Find company by domain with flexible matching across domains array.
-        Mimics the Node.js backend domain matching logic.
+        Stored JSON document of the company owning a domain (or its closest parent).
+        One indexed query reading only the document column. Returns None when no company
+        matches and an empty string when the company's document hasn't been rendered yet.
         """
-        if not domain:
+        candidates = candidate_domains(normalize_domain(domain))
+        if not candidates:
             return None
+        
+        entries = CompanyDomain.objects.filter(domain__in=candidates).values_list('domain', 'company__document')
+        best = max(entries, key=lambda entry: len(entry[0]), default=None)
+        return best[1] if best else None
+    
+    @classmethod
+    def refresh_documents(cls, company_ids=None, batch_size=500):
+        """
+        Re-render the stored document of the given companies (all companies when None)
+        and, on PostgreSQL, their full-text search vector.
+        Written with bulk_update, so no signals fire and updated_at is left alone.
+        Returns the number of documents written.
+        """
+        from .renderers import dumps
+        from .search import refresh_search_vectors
+        from .serializers import CompanySerializer
+        
+        queryset = cls.objects.prefetch_related(cls.prefetch_alternatives()).order_by('id')
+        if company_ids is not None:
+            company_ids = set(company_ids)
+            if not company_ids:
+                return 0
+            queryset = queryset.filter(pk__in=company_ids)
+        
+        written = 0
+        batch = []
+        for company in queryset.iterator(chunk_size=batch_size):
+            company.document = dumps(CompanySerializer(company).data).decode('utf-8')
+            batch.append(company)
+            if len(batch) >= batch_size:
+                cls.objects.bulk_update(batch, ['document'])
+                written += len(batch)
+                batch = []
+        if batch:
+            cls.objects.bulk_update(batch, ['document'])
+            written += len(batch)
+        refresh_search_vectors(company_ids)
+        return written
+    
+    @classmethod
+    def delete_all(cls, batch_size=1000):
+        """
+        Delete every company in a few statements, for seed_companies --clear.
+        Tombstones are written with one bulk insert from a single read, and rows are
+        removed with one DELETE per table (dependents first), so no per-row signals fire
+        and the dataset generation is left for the caller to bump once.
+        Returns the number of companies deleted.
+        """
+        with transaction.atomic():
+            deleted_at = timezone.now()
+            tombstones = []
+            rows = cls.objects.values_list('id', 'company', 'domains').order_by()
+            for company_id, company, domains in rows.iterator(chunk_size=batch_size):
+                tombstones.append(CompanyTombstone(
+                    company_id=company_id, company=company, domains=domains or [], deleted_at=deleted_at
+                ))
+                if len(tombstones) >= batch_size:
+                    CompanyTombstone.objects.bulk_create(tombstones)
+                    tombstones = []
+            if tombstones:
+                CompanyTombstone.objects.bulk_create(tombstones)
             
-        # Normalize input domain
-        normalized_domain = domain.lower()
-        if normalized_domain.startswith('www.'):
-            normalized_domain = normalized_domain[4:]
+            CompanyRequest.objects.filter(created_company__isnull=False).update(created_company=None)
+            # No signals or relations point at index rows, so this is a single fast DELETE
+            CompanyDomain.objects.all().delete()
+            # QuerySet.delete() would fetch companies and alternatives to send post_delete for
+            # each row (a tombstone and a document refresh apiece), so delete them in plain SQL
+            with connection.cursor() as cursor:
+                for model in (CompanyAlternative, cls):
+                    cursor.execute('DELETE FROM {}'.format(connection.ops.quote_name(model._meta.db_table)))
+                return cursor.rowcount
+    
+    @classmethod
+    def find_by_domains(cls, domains):
+        """
+        Resolve many domains at once with a single indexed query.
+        Returns a dict of normalized domain → Company for the domains that matched,
+        using the same parent-domain resolution as find_by_domain.
+        """
+        candidates_by_domain = {}
+        for domain in domains:
+            normalized_domain = normalize_domain(domain)
+            if normalized_domain:
+                candidates_by_domain[normalized_domain] = candidate_domains(normalized_domain)
         
-        # Search for companies that contain this domain in their domains array
-        # Try exact match first
-        companies = cls.objects.filter(domains__icontains=normalized_domain)
-        for company in companies:
-            for comp_domain in company.domains:
-                comp_normalized = comp_domain.lower()
-                if comp_normalized.startswith('www.'):
-                    comp_normalized = comp_normalized[4:]
-                if comp_normalized == normalized_domain:
-                    return company
+        all_candidates = set()
+        for candidates in candidates_by_domain.values():
+            all_candidates.update(candidates)
+        if not all_candidates:
+            return {}
         
-        # Try with www prefix
-        www_domain = f"www.{normalized_domain}"
-        companies = cls.objects.filter(domains__icontains=www_domain)
+        companies_by_candidate = {
+            entry.domain: entry.company
+            for entry in CompanyDomain.objects.select_related('company').filter(domain__in=all_candidates)
+        }
+        
+        found = {}
+        for normalized_domain, candidates in candidates_by_domain.items():
+            # Candidates are ordered longest first
+            for candidate in candidates:
+                if candidate in companies_by_candidate:
+                    found[normalized_domain] = companies_by_candidate[candidate]
+                    break
+        return found
+
+
+class CompanyDomain(models.Model):
+    """
+    Normalized domain index for Company.domains.
+    One row per normalized domain, so domain lookups never scan the JSON array.
+    The domain is also stored reversed, so suffix searches are indexed prefix scans.
+    Kept in sync by Company.save() and by the bulk helpers used when seeding;
+    create rows with entry() so the reversed copy is filled in.
+    """
+    
+    domain = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Normalized domain (lowercase, without www.)"
+    )
+    reversed_domain = models.CharField(
+        max_length=255,
+        db_index=True,
+        default='',
+        editable=False,
+        help_text="The domain spelled backwards, for suffix matching"
+    )
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='domain_entries',
+        help_text="The company owning this domain"
+    )
+    
+    class Meta:
+        verbose_name = "Company Domain"
+        verbose_name_plural = "Company Domains"
+        ordering = ['domain']
+    
+    def __str__(self):
+        return "{} → {}".format(self.domain, self.company_id)
+    
+    def save(self, *args, **kwargs):
+        self.reversed_domain = self.domain[::-1]
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def entry(cls, domain, **kwargs):
+        """Unsaved index row for a normalized domain, with its reversed copy."""
+        return cls(domain=domain, reversed_domain=domain[::-1], **kwargs)
+    
+    @classmethod
+    def index_companies(cls, companies, batch_size=1000):
+        """
+        Add index rows for already saved companies (e.g. after bulk_create).
+        Existing rows are kept; earlier owners win on conflicting domains.
+        Returns the number of rows submitted.
+        """
+        entries = []
+        seen = set()
         for company in companies:
-            if www_domain in [d.lower() for d in company.domains]:
-                return company
+            for domain in company.get_normalized_domains():
+                if domain in seen:
+                    continue
+                seen.add(domain)
+                entries.append(cls.entry(domain, company_id=company.pk))
         
-        return None
+        cls.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+        return len(entries)
+    
+    @classmethod
+    def rebuild_index(cls, batch_size=1000):
+        """
+        Rebuild the whole index from Company.domains.
+        Companies are processed in name order so the first company wins on duplicates.
+        """
+        cls.objects.all().delete()
+        companies = Company.objects.only('id', 'domains').order_by('company', 'id')
+        return cls.index_companies(companies.iterator(chunk_size=batch_size), batch_size=batch_size)
+
+
+class CompanyTombstone(models.Model):
+    """
+    Record of a deleted company, kept so the change feed can report deletions.
+    Written by a post_delete signal; company_id is the id the company had.
+    """
+    
+    company_id = models.BigIntegerField(
+        help_text="Id of the deleted company"
+    )
+    company = models.CharField(
+        max_length=255,
+        help_text="Company name at deletion time"
+    )
+    domains = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Domains the company had at deletion time"
+    )
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Company Tombstone"
+        verbose_name_plural = "Company Tombstones"
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ]
+    
+    def __str__(self):
+        return "{} (deleted {})".format(self.company, self.deleted_at)
 
 
 class DataVersion(models.Model):
@@ -211,6 +500,10 @@ class DataVersion(models.Model):
         default=0,
         help_text="Number of public companies"
     )
+    generation = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Dataset generation; bumped on every data change to invalidate caches"
+    )
     last_updated = models.DateTimeField(
         auto_now=True,
         help_text="When this version was last updated"
@@ -230,6 +523,26 @@ class DataVersion(models.Model):
         """Get the current/latest data version."""
         return cls.objects.first()
     
+    @classmethod
+    def current_generation(cls):
+        """Highest dataset generation stored in the database (0 when there is no version yet)."""
+        return cls.objects.aggregate(value=Max('generation'))['value'] or 0
+    
+    @classmethod
+    def bump_generation(cls, at_least=0):
+        """
+        Increment the stored dataset generation and mark the data as updated.
+        Creates the default version if none exists. Returns the new generation.
+        """
+        now = timezone.now()
+        if not cls.objects.update(generation=F('generation') + 1, last_updated=now):
+            cls.objects.create(version='1.0.0', generation=max(1, at_least)).update_counts()
+        generation = cls.current_generation()
+        if generation < at_least:
+            cls.objects.update(generation=at_least)
+            generation = at_least
+        return generation
+    
     def update_counts(self):
         """Update all count fields based on current data."""
         self.total_companies = Company.objects.count()
@@ -288,6 +601,11 @@ class CompanyAlternative(models.Model):
     def __str__(self):
         return f"{self.from_company.company} → {self.to_company.company}"
     
+    def save(self, *args, **kwargs):
+        """Save in one transaction, so the generation bump (on commit) follows the document refresh."""
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+    
     def clean(self):
         """Validation to ensure to_company is carbon neutral."""
         from django.core.exceptions import ValidationError
@@ -363,30 +681,98 @@ class CompanyRequest(models.Model):
     def record_request(cls, domain):
         """
         Record a request for a domain. Creates new record or increments count.
-        Returns the CompanyRequest instance.
+        Subdomains are recorded under their registrable domain (shop.brand.com.tr → brand.com.tr).
+        A single atomic upsert, so concurrent workers never lose increments.
         """
-        # Normalize domain
-        normalized_domain = domain.lower()
-        if normalized_domain.startswith('www.'):
-            normalized_domain = normalized_domain[4:]
-
-        # Use get_or_create with update on existing
-        request, created = cls.objects.get_or_create(
-            domain=normalized_domain,
-            defaults={
-                'request_count': 1,
-                'status': cls.Status.PENDING,
+        cls.record_requests([domain])
+    
+    @classmethod
+    def record_requests(cls, domains):
+        """
+        Record a batch of missed domains.
+        Repeated domains in the batch are counted, not duplicated.
+        Returns the number of distinct domains recorded.
+        """
+        counts = Counter()
+        for domain in domains:
+            normalized_domain = registrable_domain(normalize_domain(domain))
+            if normalized_domain:
+                counts[normalized_domain] += 1
+        return cls.increment_counts(counts)
+    
+    @classmethod
+    def increment_counts(cls, counts):
+        """
+        Add request counts for already normalized domains in one statement:
+        INSERT ... ON CONFLICT (domain) DO UPDATE (PostgreSQL and SQLite 3.24+).
+        Other databases fall back to an UPDATE/INSERT pair per domain.
+        Returns the number of distinct domains recorded.
+        """
+        if not counts:
+            return 0
+        
+        now = timezone.now()
+        if not cls._supports_upsert():
+            cls._increment_counts_fallback(counts, now)
+            return len(counts)
+        
+        adapted_now = connection.ops.adapt_datetimefield_value(now)
+        table = connection.ops.quote_name(cls._meta.db_table)
+        columns = ['domain', 'request_count', 'status', 'admin_notes', 'created_at', 'updated_at', 'last_requested_at']
+        rows = [
+            (domain, count, cls.Status.PENDING, '', adapted_now, adapted_now, adapted_now)
+            for domain, count in sorted(counts.items())  # Stable order avoids lock-order deadlocks
+        ]
+        
+        max_params = connection.features.max_query_params
+        batch_size = max(1, max_params // len(columns)) if max_params else len(rows)
+        placeholder = '({})'.format(', '.join(['%s'] * len(columns)))
+        
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                sql = (
+                    'INSERT INTO {table} ({columns}) VALUES {values} '
+                    'ON CONFLICT (domain) DO UPDATE SET '
+                    'request_count = {table}.request_count + EXCLUDED.request_count, '
+                    'last_requested_at = EXCLUDED.last_requested_at, '
+                    'updated_at = EXCLUDED.updated_at'
+                ).format(
+                    table=table,
+                    columns=', '.join(connection.ops.quote_name(column) for column in columns),
+                    values=', '.join([placeholder] * len(batch)),
+                )
+                cursor.execute(sql, [value for row in batch for value in row])
+        
+        return len(counts)
+    
+    @staticmethod
+    def _supports_upsert():
+        """Whether the database understands INSERT ... ON CONFLICT DO UPDATE."""
+        if connection.vendor == 'postgresql':
+            return True
+        if connection.vendor == 'sqlite':
+            return connection.Database.sqlite_version_info >= (3, 24, 0)
+        return False
+    
+    @classmethod
+    def _increment_counts_fallback(cls, counts, now):
+        """Portable path: atomic UPDATE with F(), INSERT when missing, retry on a lost race."""
+        for domain, count in counts.items():
+            values = {
+                'request_count': F('request_count') + count,
+                'last_requested_at': now,
+                'updated_at': now,
             }
-        )
-
-        if not created:
-            # Increment count and update timestamp
-            request.request_count += 1
-            request.last_requested_at = timezone.now()
-            request.save(update_fields=['request_count', 'last_requested_at', 'updated_at'])
-
-        return request
-
+            if cls.objects.filter(domain=domain).update(**values):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(domain=domain, request_count=count, status=cls.Status.PENDING)
+            except IntegrityError:
+                # Another worker inserted it first
+                cls.objects.filter(domain=domain).update(**values)
+    
     def approve_and_create_company(self, company_name, **kwargs):
         """
         Approve this request and create a Company from it.
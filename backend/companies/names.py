@@ -0,0 +1,28 @@
+"""
+Company name helpers shared by the models, search and lookup indexes.
+Much of the dataset is Turkish (A.Ş., İ, ı, ş), where str.lower() and SQL
+lower()/ILIKE disagree on dotted and dotless i, so names are matched through
+a folded key computed in Python and stored on Company.name_key.
+"""
+
+import unicodedata
+
+# Company.name_key column width; casefolding can lengthen a name (ß → ss)
+NAME_KEY_MAX_LENGTH = 255
+
+
+def fold(text):
+    """Case-fold and strip accents for matching; dotted and dotless i both become i."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).replace('ı', 'i')
+
+
+def name_key(name):
+    """
+    Matching key of a company name: folded, with runs of whitespace collapsed.
+    'ARÇELİK  A.Ş.', 'Arçelik A.Ş.' and 'arcelik a.s.' share the key 'arcelik a.s.'.
+    Returns an empty string for empty input.
+    """
+    if not name:
+        return ''
+    return ' '.join(fold(name).split())[:NAME_KEY_MAX_LENGTH]
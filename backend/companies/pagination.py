@@ -0,0 +1,118 @@
+"""
+Pagination classes for the company list endpoints.
+"""
+
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import get_cache, get_generation
+
+
+class CompanyPagination(LimitOffsetPagination):
+    """
+    Custom pagination to match Node.js backend behavior.
+    """
+    default_limit = 50
+    max_limit = 1000
+
+
+class CompanyKeysetPagination(BasePagination):
+    """
+    Opt-in keyset pagination over the (company, id) ordering.
+    Each page is a range scan on company_name_id_idx starting after the last row of
+    the previous page, so a page costs the same however deep it is.
+    Cursors are opaque; the total count is only computed with ?count=true and is
+    cached per dataset generation.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    limit_query_param = 'limit'
+    count_query_param = 'count'
+    default_limit = 50
+    max_limit = 1000
+    ordering = ('company', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def is_requested(cls, request):
+        """True for ?pagination=cursor or when following a cursor link."""
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get(cls.mode_query_param) == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = self.get_count(queryset)
+
+        page = queryset.order_by(*self.ordering)
+        if position is not None:
+            name, pk = position
+            # company__gte lets the planner start the index scan at the cursor
+            page = page.filter(company__gte=name).filter(Q(company__gt=name) | Q(id__gt=pk))
+
+        rows = list(page[:self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_position = self.get_position(rows[-1]) if self.has_next else None
+        return rows
+
+    @staticmethod
+    def get_position(row):
+        """(company, id) of a model instance or a values() row."""
+        if isinstance(row, dict):
+            return row['company'], row['id']
+        return row.company, row.pk
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return min(limit, self.max_limit) if limit > 0 else self.default_limit
+
+    def get_count(self, queryset):
+        """Total row count, cached until the dataset generation changes."""
+        key = 'company-count:{}'.format(get_generation())
+        return get_cache().get_or_set(key, queryset.count, None)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        data = json.dumps(list(position), separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode_cursor(self, request):
+        """Return (company, id) from the cursor parameter, or None for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            name, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(name, str) or not isinstance(pk, int):
+                raise ValueError
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return name, pk
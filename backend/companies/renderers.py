@@ -0,0 +1,133 @@
+"""
+Fast JSON rendering for API responses.
+Encodes with orjson when it is installed and falls back to the stdlib json
+module otherwise. Either way the bytes are exactly what rest_framework's
+JSONRenderer produces (compact, unescaped unicode, U+2028/U+2029 escaped).
+
+Already-encoded JSON can be embedded with JSONFragment; it is copied into the
+output verbatim instead of being decoded and encoded again.
+"""
+
+import json
+import re
+import secrets
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Fragments are encoded as a unique placeholder string and spliced in afterwards
+_FRAGMENT_TOKEN = secrets.token_hex(8)
+_FRAGMENT_PLACEHOLDER = '\x00' + _FRAGMENT_TOKEN + ':{}\x00'
+_FRAGMENT_RE = re.compile(rb'"\\u0000' + _FRAGMENT_TOKEN.encode('ascii') + rb':(\d+)\\u0000"')
+# Floats json writes in exponent form (|x| >= 1e16 or < 1e-4) come out of orjson
+# as 1e16 / 1e-7 / 0.00005; any output that might contain one is re-encoded with json
+_FLOAT_MISMATCH_RE = re.compile(rb'\de|0\.0000')
+
+_encoder = encoders.JSONEncoder()
+
+
+class JSONFragment:
+    """
+    Already-encoded JSON (UTF-8 bytes) that dumps() and FastJSONRenderer embed as is.
+    """
+    __slots__ = ('encoded',)
+
+    def __init__(self, encoded):
+        self.encoded = encoded.encode('utf-8') if isinstance(encoded, str) else bytes(encoded)
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(dumps(data))
+
+    def __eq__(self, other):
+        return isinstance(other, JSONFragment) and other.encoded == self.encoded
+
+    def __hash__(self):
+        return hash(self.encoded)
+
+
+def _python_dumps(data, default):
+    return json.dumps(
+        data,
+        default=default,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': '),
+    ).encode('utf-8')
+
+
+def _orjson_dumps(data, default):
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    try:
+        encoded = orjson.dumps(data, default=default, option=options)
+    except orjson.JSONEncodeError:
+        return None
+    if _FLOAT_MISMATCH_RE.search(encoded):
+        return None
+    return encoded
+
+
+def _use_orjson():
+    backend = settings.JSON_BACKEND
+    if backend == 'python' or orjson is None:
+        return False
+    return backend in ('auto', 'orjson') and api_settings.UNICODE_JSON and api_settings.COMPACT_JSON
+
+
+def dumps(data):
+    """
+    Encode data as compact UTF-8 JSON bytes, embedding JSONFragments verbatim.
+    Types json can't handle natively are converted by DRF's JSONEncoder.
+    """
+    fragments = []
+
+    def default(obj):
+        if isinstance(obj, JSONFragment):
+            fragments.append(obj.encoded)
+            return _FRAGMENT_PLACEHOLDER.format(len(fragments) - 1)
+        return _encoder.default(obj)
+
+    encoded = _orjson_dumps(data, default) if _use_orjson() else None
+    if encoded is None:
+        fragments.clear()
+        encoded = _python_dumps(data, default)
+
+    if fragments:
+        encoded = _FRAGMENT_RE.sub(lambda match: fragments[int(match.group(1))], encoded)
+    return encoded
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for rest_framework's JSONRenderer built on dumps().
+    Indented output (Accept: application/json; indent=4) goes through the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            if _contains_fragment(data):
+                data = json.loads(dumps(data))
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer: U+2028/U+2029 break JavaScript string literals
+        return dumps(data).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def _contains_fragment(data):
+    if isinstance(data, JSONFragment):
+        return True
+    if isinstance(data, dict):
+        return any(_contains_fragment(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_contains_fragment(value) for value in data)
+    return False
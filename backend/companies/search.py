@@ -0,0 +1,393 @@
+"""
+Company search backends for /api/companies/search.
+
+Full-text search (?q=): on PostgreSQL the name and the tr/en/de descriptions are
+indexed in Company.search_vector (GIN) with a stemming config per language and
+matches are ranked with ts_rank. Elsewhere (SQLite development) a per-worker
+in-memory inverted index built from the same columns answers the query instead.
+
+Name search (?company=) matches the folded Company.name_key, so Turkish dotted
+and dotless i and accents match the same on every database.
+Fuzzy name search (?company=...&fuzzy=true): trigram similarity, served by a
+pg_trgm GIN index on name_key on PostgreSQL and by a per-worker trigram index elsewhere.
+
+Domain search (?domain=): exact, suffix and prefix matches against the
+CompanyDomain index (prefix scans on domain and reversed_domain).
+"""
+
+import heapq
+import logging
+import math
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Value, When
+from django.db.models.fields.json import KeyTextTransform
+from django.utils import timezone
+
+from .names import fold, name_key
+from .snapshot import SnapshotHolder
+
+logger = logging.getLogger(__name__)
+
+# Description language → PostgreSQL text search configuration
+TEXT_SEARCH_CONFIGS = {
+    'tr': 'turkish',
+    'en': 'english',
+    'de': 'german',
+}
+# Names are proper nouns: index them without stemming
+NAME_SEARCH_CONFIG = 'simple'
+
+# ts_rank's default weights for the A (name) and B (description) labels
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+# In-memory index: query terms of at least this length also match longer tokens
+# (a cheap stand-in for stemming), at this fraction of the weight of an exact match
+MIN_PREFIX_LENGTH = 3
+PREFIX_MATCH_FACTOR = 0.5
+# Fuzzy name queries are cut to this many characters, bounding the trigrams looked up
+FUZZY_MAX_QUERY_LENGTH = 64
+
+# Domain search match ranks, best first; companies only matched by name rank last
+DOMAIN_EXACT, DOMAIN_SUFFIX, DOMAIN_PREFIX, DOMAIN_FRAGMENT, NAME_ONLY = range(5)
+
+_TOKEN_RE = re.compile(r'\w+')
+# pg_trgm splits words on anything that isn't alphanumeric
+_TRIGRAM_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Folded word tokens of at least two characters."""
+    return [token for token in _TOKEN_RE.findall(fold(text)) if len(token) > 1]
+
+
+def trigrams(text):
+    """
+    pg_trgm-style trigram set of the folded text: each word padded with two
+    leading spaces and one trailing space.
+    """
+    result = set()
+    for word in _TRIGRAM_WORD_RE.findall(fold(text)):
+        padded = '  ' + word + ' '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def description_texts(description):
+    """Language → text pairs of a Company.description value (a dict, or legacy plain text as en)."""
+    if isinstance(description, dict):
+        return [(language, text) for language, text in description.items() if isinstance(text, str)]
+    if isinstance(description, str):
+        return [('en', description)]
+    return []
+
+
+def use_database_search():
+    """Whether ?q= runs against the PostgreSQL search vector (SEARCH_BACKEND)."""
+    backend = settings.SEARCH_BACKEND
+    if backend == 'auto':
+        return connection.vendor == 'postgresql'
+    return backend == 'postgres'
+
+
+def search_vector():
+    """
+    Expression stored in Company.search_vector: the folded name key (A) plus every
+    description language (B).
+    """
+    vector = SearchVector('name_key', config=NAME_SEARCH_CONFIG, weight='A')
+    for language, config in TEXT_SEARCH_CONFIGS.items():
+        vector = vector + SearchVector(KeyTextTransform(language, 'description'), config=config, weight='B')
+    return vector
+
+
+def search_query(text):
+    """
+    websearch_to_tsquery of the text under every config the vector was built with, OR-ed.
+    The name config gets the text folded like Company.name_key.
+    """
+    query = SearchQuery(name_key(text), config=NAME_SEARCH_CONFIG, search_type='websearch')
+    for config in TEXT_SEARCH_CONFIGS.values():
+        query = query | SearchQuery(text, config=config, search_type='websearch')
+    return query
+
+
+def refresh_search_vectors(company_ids=None):
+    """
+    Recompute Company.search_vector in the database (PostgreSQL only).
+    Uses a queryset update, so no signals fire and updated_at is left alone.
+    """
+    from .models import Company
+
+    if connection.vendor != 'postgresql':
+        return 0
+    queryset = Company.objects.all()
+    if company_ids is not None:
+        queryset = queryset.filter(pk__in=set(company_ids))
+    return queryset.update(search_vector=search_vector())
+
+
+def search_companies(queryset, text):
+    """
+    Narrow a Company queryset to full-text matches of text, best match first
+    (ties by name, then id). Returns an empty queryset when nothing matches.
+    """
+    if use_database_search():
+        query = search_query(text)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', 'company', 'id')
+
+    # Only an index of the current generation; results are cached under it
+    index = full_text_index.get_current(wait=True)
+    if index is None:
+        return queryset.none()
+    ranked = [company_id for company_id, _ in index.search(text, settings.SEARCH_MAX_RESULTS)]
+    return _in_ranked_order(queryset, ranked, 'search_rank')
+
+
+def _domain_conditions(domain):
+    return {
+        DOMAIN_EXACT: Q(domain=domain),
+        # mail.google.com for google.com, but not notgoogle.com
+        DOMAIN_SUFFIX: Q(reversed_domain__startswith=('.' + domain)[::-1]),
+        # google.com.tr for google.com
+        DOMAIN_PREFIX: Q(domain__startswith=domain),
+        # Ends with the domain off a label boundary: notgoogle.com for google.com, google.com.tr for .com.tr
+        DOMAIN_FRAGMENT: Q(reversed_domain__startswith=domain[::-1]),
+    }
+
+
+def domain_match_filter(domain):
+    """
+    Q matching companies with an indexed domain equal to, ending with or starting with
+    the normalized domain. Each condition is an indexed scan of CompanyDomain.
+    """
+    from .models import CompanyDomain
+
+    condition = Q()
+    for match in _domain_conditions(domain).values():
+        condition |= match
+    return Q(pk__in=CompanyDomain.objects.filter(condition).values('company_id'))
+
+
+def domain_match_rank(domain):
+    """Per-company rank of its best domain match (DOMAIN_EXACT … NAME_ONLY) for ordering."""
+    from .models import CompanyDomain
+
+    entries = CompanyDomain.objects.filter(company=OuterRef('pk'))
+    return Case(
+        *[When(Exists(entries.filter(match)), then=Value(rank)) for rank, match in _domain_conditions(domain).items()],
+        default=Value(NAME_ONLY),
+        output_field=IntegerField(),
+    )
+
+
+def similar_companies(queryset, name):
+    """
+    Narrow a Company queryset to names trigram-similar to name (at least
+    SEARCH_FUZZY_THRESHOLD), most similar first (ties by name, then id).
+    The caller caps the result at SEARCH_FUZZY_LIMIT.
+    """
+    threshold = settings.SEARCH_FUZZY_THRESHOLD
+    name = name[:FUZZY_MAX_QUERY_LENGTH]
+    if use_database_search():
+        # name_key % key uses the GIN index under pg_trgm.similarity_threshold (0.3 by default)
+        key = name_key(name)
+        return queryset.filter(name_key__trigram_similar=key).annotate(
+            similarity=TrigramSimilarity('name_key', key)
+        ).filter(similarity__gte=threshold).order_by('-similarity', 'company', 'id')
+
+    # Only an index of the current generation; results are cached under it
+    index = trigram_index.get_current(wait=True)
+    if index is None:
+        return queryset.none()
+    ranked = [company_id for company_id, _ in index.search(name, settings.SEARCH_FUZZY_LIMIT, threshold)]
+    return _in_ranked_order(queryset, ranked, 'similarity')
+
+
+def _in_ranked_order(queryset, ranked, alias):
+    """Restrict a queryset to the ranked company ids, in that order (annotated as alias)."""
+    if not ranked:
+        return queryset.none()
+    position = Case(
+        *[When(pk=company_id, then=Value(index)) for index, company_id in enumerate(ranked)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=ranked).annotate(**{alias: position}).order_by(alias)
+
+
+class FullTextIndex:
+    """
+    In-memory inverted index over company names and descriptions.
+    Maps folded token → {company id: weight}; a sorted token list serves prefix matches.
+    All query terms must match; scores add up per term. Immutable once built.
+    """
+
+    def __init__(self, postings, names, stamp, generation, build_seconds):
+        self._postings = postings
+        self._tokens = sorted(postings)
+        self._names = names
+        self.stamp = stamp
+        self.generation = generation
+        self.build_seconds = build_seconds
+        self.built_at = timezone.now()
+
+    def __len__(self):
+        return len(self._names)
+
+    def _term_matches(self, term):
+        matches = dict(self._postings.get(term, ()))
+        if len(term) >= MIN_PREFIX_LENGTH:
+            tokens = self._tokens
+            position = bisect_left(tokens, term)
+            while position < len(tokens) and tokens[position].startswith(term):
+                token = tokens[position]
+                position += 1
+                if token == term:
+                    continue
+                for company_id, weight in self._postings[token].items():
+                    weight *= PREFIX_MATCH_FACTOR
+                    if weight > matches.get(company_id, 0):
+                        matches[company_id] = weight
+        return matches
+
+    def search(self, text, limit):
+        """Up to limit (company id, score) pairs, best first."""
+        scores = None
+        for term in dict.fromkeys(tokenize(text)):
+            matches = self._term_matches(term)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {company_id: score + matches[company_id]
+                          for company_id, score in scores.items() if company_id in matches}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        names = self._names
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], names[item[0]], item[0]))
+        return ranked[:limit]
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'datasetGeneration': self.stamp,
+            'companies': len(self._names),
+            'tokens': len(self._tokens),
+            'buildTimeMs': round(self.build_seconds * 1000, 2),
+            'builtAt': self.built_at.isoformat(),
+        }
+
+    @classmethod
+    def build(cls, stamp, generation):
+        from .models import Company
+
+        started = time.perf_counter()
+        postings = {}
+        names = {}
+
+        def add(token, company_id, weight):
+            entries = postings.setdefault(token, {})
+            if weight > entries.get(company_id, 0):
+                entries[company_id] = weight
+
+        rows = Company.objects.values_list('id', 'company', 'description')
+        for company_id, name, description in rows.iterator(chunk_size=2000):
+            names[company_id] = name
+            for token in tokenize(name):
+                add(token, company_id, NAME_WEIGHT)
+            for _, text in description_texts(description):
+                for token in tokenize(text):
+                    add(token, company_id, DESCRIPTION_WEIGHT)
+
+        return cls(postings, names, stamp=stamp, generation=generation,
+                   build_seconds=time.perf_counter() - started)
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over company names, scoring like pg_trgm's similarity()
+    (shared trigrams / trigrams in either name).
+    Only posting lists are kept: overlaps are counted per name with Counter.update over
+    the query's postings (a C loop), and a name reaching the threshold must share at least
+    ceil(threshold × |query trigrams|) of them, so most names are discarded on the count alone.
+    Work is bounded by the postings of the query's trigrams, and queries are truncated to
+    FUZZY_MAX_QUERY_LENGTH. Immutable once built.
+    """
+
+    def __init__(self, ids, names, sizes, postings, stamp, generation, build_seconds):
+        self._ids = ids
+        self._names = names
+        self._sizes = sizes
+        self._postings = postings
+        self.stamp = stamp
+        self.generation = generation
+        self.build_seconds = build_seconds
+        self.built_at = timezone.now()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def search(self, name, limit, threshold):
+        """Up to limit (company id, similarity) pairs with similarity >= threshold, best first."""
+        query = trigrams(name[:FUZZY_MAX_QUERY_LENGTH])
+        if not query or limit <= 0:
+            return []
+        query_size = len(query)
+        required = max(1, math.ceil(threshold * query_size))
+
+        counts = Counter()
+        for trigram in query:
+            positions = self._postings.get(trigram)
+            if positions:
+                counts.update(positions)
+
+        sizes, names, ids = self._sizes, self._names, self._ids
+        scored = []
+        for position, shared in counts.items():
+            if shared >= required:
+                similarity = shared / (query_size + sizes[position] - shared)
+                if similarity >= threshold:
+                    scored.append((-similarity, names[position], ids[position]))
+        return [(company_id, -negated) for negated, _, company_id in heapq.nsmallest(limit, scored)]
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'datasetGeneration': self.stamp,
+            'companies': len(self._ids),
+            'trigrams': len(self._postings),
+            'buildTimeMs': round(self.build_seconds * 1000, 2),
+            'builtAt': self.built_at.isoformat(),
+        }
+
+    @classmethod
+    def build(cls, stamp, generation):
+        from .models import Company
+
+        started = time.perf_counter()
+        ids, names, sizes, postings = [], [], [], {}
+        rows = Company.objects.values_list('id', 'company')
+        for company_id, name in rows.iterator(chunk_size=5000):
+            position = len(ids)
+            grams = trigrams(name)
+            ids.append(company_id)
+            names.append(name)
+            sizes.append(len(grams))
+            for trigram in grams:
+                postings.setdefault(trigram, []).append(position)
+
+        return cls(ids, names, sizes, postings, stamp=stamp, generation=generation,
+                   build_seconds=time.perf_counter() - started)
+
+
+full_text_index = SnapshotHolder(FullTextIndex)
+trigram_index = SnapshotHolder(TrigramIndex)
@@ -1,4 +1,8 @@
+from functools import lru_cache
+
+from django_countries.fields import Country
 from rest_framework import serializers
+from .languages import ALL_LANGUAGES, select_description
 from .models import Company, DataVersion, CompanyAlternative
 
 
@@ -44,10 +48,42 @@ class CompanyAlternativeSerializer(serializers.ModelSerializer):
         return f"{sector} company. {carbon_info}{renewable_info}".strip(', ')
 
 
+def parse_fields(value, available):
+    """
+    Parse a ?fields=a,b value into the requested field names, in `available` order.
+    Returns None when no field set was requested; raises ValueError for unknown names.
+    """
+    if value is None or not value.strip():
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(available)
+    if unknown:
+        raise ValueError('Unknown fields: {}'.format(', '.join(sorted(unknown))))
+    return [name for name in available if name in requested]
+
+
+# Company columns an output field is computed from, where they differ from its name
+FIELD_COLUMNS = {
+    'domain': ('domains',),
+    'carbon_neutral_alternatives': ('carbon_neutral',),
+}
+
+
+def columns_for(fields):
+    """Company columns needed to serialize the given output fields (always including id)."""
+    columns = {'id'}
+    for name in fields:
+        columns.update(FIELD_COLUMNS.get(name, (name,)))
+    return sorted(columns)
+
+
 class CompanySerializer(serializers.ModelSerializer):
     """
     Serializer for Company model.
     Matches the JSON structure from the Node.js backend.
+    Pass fields=[...] to serialize only a subset; dropped method fields (such as the
+    alternatives) are never evaluated. A 'language' in the context narrows the
+    description to that language (see companies.languages).
     """
     carbon_neutral_alternatives = serializers.SerializerMethodField()
     origin = serializers.CharField(source='origin.code', read_only=True, allow_null=True)
@@ -74,6 +110,23 @@ class CompanySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
     
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    @classmethod
+    def available_fields(cls):
+        return cls.Meta.fields
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        language = self.context.get('language', ALL_LANGUAGES)
+        if language != ALL_LANGUAGES and 'description' in data:
+            data['description'] = select_description(data['description'], language)
+        return data
+    
     def get_carbon_neutral_alternatives(self, obj):
         """
         Get carbon neutral alternatives for this company.
@@ -82,9 +135,12 @@ class CompanySerializer(serializers.ModelSerializer):
         if obj.carbon_neutral:
             return []  # No alternatives needed for carbon neutral companies
         
-        alternatives_qs = CompanyAlternative.objects.filter(
-            from_company=obj
-        ).select_related('to_company').order_by('-relevance_score')
+        # Querysets built with Company.prefetch_alternatives() already carry them
+        alternatives_qs = getattr(obj, 'prefetched_alternatives', None)
+        if alternatives_qs is None:
+            alternatives_qs = CompanyAlternative.objects.filter(
+                from_company=obj
+            ).select_related('to_company').order_by('-relevance_score')
         
         return CompanyAlternativeSerializer(alternatives_qs, many=True).data
     
@@ -119,6 +175,24 @@ class CompanyListSerializer(serializers.ModelSerializer):
         return obj.primary_domain
 
 
+class CompanyExportSerializer(CompanyListSerializer):
+    """
+    Serializer for the NDJSON export: the list fields plus change tracking.
+    """
+    
+    class Meta(CompanyListSerializer.Meta):
+        fields = CompanyListSerializer.Meta.fields + ['is_approved', 'updated_at']
+
+
+class CompanyChangeSerializer(CompanyExportSerializer):
+    """
+    Serializer for change feed entries; includes the id used to apply deletions.
+    """
+    
+    class Meta(CompanyExportSerializer.Meta):
+        fields = ['id'] + CompanyExportSerializer.Meta.fields + ['created_at']
+
+
 class CompanySearchSerializer(serializers.ModelSerializer):
     """
     Serializer for search results with minimal fields.
@@ -140,6 +214,95 @@ class CompanySearchSerializer(serializers.ModelSerializer):
         return obj.primary_domain
 
 
+@lru_cache(maxsize=1024)
+def _country_code(value):
+    """Same value CountryField's descriptor exposes as origin.code (e.g. 'tr' → 'TR')."""
+    return Country(code=value).code
+
+
+def _origin_code(origin):
+    return _country_code(origin) if origin is not None else None
+
+
+def _primary_domain(domains):
+    return domains[0] if domains else None
+
+
+class CompanyRowSerializer:
+    """
+    Read-only fast path for flat company payloads.
+    Serializes queryset.values(*columns) rows straight into dicts, skipping model
+    instantiation and DRF field machinery. The output is identical to the
+    ModelSerializer it mirrors (same keys, order and values).
+    Accepts the same (instance, many=True) arguments as a DRF serializer so
+    generic views can use it as serializer_class, plus fields=[...] for a sparse
+    field set (select the matching columns with values(queryset, fields)).
+    Subclasses set columns and fields, the output fields in order.
+    """
+    columns = ()
+    fields = ()
+    
+    # Output field → value from a values() row
+    getters = {
+        'domain': lambda row: _primary_domain(row['domains']),
+        'domains': lambda row: row['domains'],
+        'company': lambda row: row['company'],
+        'carbon_neutral': lambda row: row['carbon_neutral'],
+        'renewable_share_percent': lambda row: row['renewable_share_percent'],
+        'parent': lambda row: row['parent'],
+        'headquarters': lambda row: row['headquarters'],
+        'origin': lambda row: _origin_code(row['origin']),
+        'sector': lambda row: row['sector'],
+    }
+    
+    def __init__(self, instance=None, many=False, fields=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        if fields is not None:
+            self.fields = fields
+    
+    @classmethod
+    def available_fields(cls):
+        return cls.fields
+    
+    @classmethod
+    def values(cls, queryset, fields=None):
+        """Restrict a Company queryset to the columns this serializer (or the field subset) reads."""
+        if fields is None:
+            return queryset.values(*cls.columns)
+        # company and id are kept for keyset pagination
+        return queryset.values(*sorted(set(columns_for(fields)) | {'company'}))
+    
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+    
+    def to_representation(self, row):
+        getters = self.getters
+        return {name: getters[name](row) for name in self.fields}
+
+
+class CompanyListRowSerializer(CompanyRowSerializer):
+    """
+    values() based equivalent of CompanyListSerializer.
+    """
+    columns = (
+        'id', 'domains', 'company', 'carbon_neutral', 'renewable_share_percent',
+        'parent', 'headquarters', 'origin', 'sector',
+    )
+    fields = tuple(CompanyListSerializer.Meta.fields)
+
+
+class CompanySearchRowSerializer(CompanyRowSerializer):
+    """
+    values() based equivalent of CompanySearchSerializer.
+    """
+    columns = ('id', 'domains', 'company', 'carbon_neutral', 'renewable_share_percent')
+    fields = tuple(CompanySearchSerializer.Meta.fields)
+
+
 class DataVersionSerializer(serializers.ModelSerializer):
     """
     Serializer for data version and statistics.
@@ -0,0 +1,51 @@
+"""
+Signal handlers keeping derived data in step with company edits.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import schedule_generation_bump
+from .models import Company, CompanyAlternative, CompanyTombstone
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=CompanyAlternative)
+@receiver(post_delete, sender=CompanyAlternative)
+def mark_dataset_changed(sender, **kwargs):
+    """
+    Bump the dataset generation, once the transaction commits, so cached responses and
+    in-process snapshots are invalidated.
+    """
+    if kwargs.get('raw'):
+        return
+    schedule_generation_bump(kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Company)
+def record_company_tombstone(sender, instance, **kwargs):
+    """Keep a tombstone so the change feed can report the deletion."""
+    CompanyTombstone.objects.create(
+        company_id=instance.pk,
+        company=instance.company,
+        domains=instance.domains or [],
+    )
+
+
+@receiver(post_save, sender=Company)
+def refresh_company_documents(sender, instance, **kwargs):
+    """Re-render the company's document and those of companies listing it as an alternative."""
+    if kwargs.get('raw'):
+        return
+    dependents = CompanyAlternative.objects.filter(to_company=instance).values_list('from_company_id', flat=True)
+    Company.refresh_documents([instance.pk, *dependents])
+
+
+@receiver(post_save, sender=CompanyAlternative)
+@receiver(post_delete, sender=CompanyAlternative)
+def refresh_alternative_documents(sender, instance, **kwargs):
+    """Re-render the document of the company whose alternatives changed."""
+    if kwargs.get('raw'):
+        return
+    Company.refresh_documents([instance.from_company_id])
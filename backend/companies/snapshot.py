@@ -0,0 +1,291 @@
+"""
+In-process, read-only snapshot of the company dataset.
+Each worker keeps its own copy and swaps in a freshly built one when the
+dataset generation changes, so hot lookups never touch the database.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .bloom import BloomFilter
+from .domains import DomainTrie, candidate_domains
+from .renderers import JSONFragment
+
+logger = logging.getLogger(__name__)
+
+
+class DomainSnapshot:
+    """
+    Immutable map of normalized domain → pre-serialized CompanySerializer payload.
+    Each payload is also kept pre-encoded as a JSONFragment for responses.
+    Subdomains resolve through a reversed-label trie to their longest indexed parent.
+    Instances are never mutated after build; refreshing replaces the whole object.
+    """
+
+    def __init__(self, payloads, stamp, generation, build_seconds, company_count):
+        self._payloads = MappingProxyType(payloads)
+        # Companies with several domains share one payload, so encode each once
+        self._fragments = {}
+        for payload in payloads.values():
+            if id(payload) not in self._fragments:
+                self._fragments[id(payload)] = JSONFragment.from_data(payload)
+        self._trie = DomainTrie()
+        for domain, payload in payloads.items():
+            self._trie.add(domain, payload)
+        self.stamp = stamp
+        self.generation = generation
+        self.build_seconds = build_seconds
+        self.company_count = company_count
+        self.built_at = timezone.now()
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def __contains__(self, domain):
+        return domain in self._payloads
+
+    def get(self, domain):
+        """Return the payload for a normalized domain or its closest indexed parent, or None."""
+        payload = self._payloads.get(domain)
+        if payload is None:
+            match = self._trie.resolve(domain)
+            if match is not None:
+                payload = match[1]
+        return payload
+
+    def get_fragment(self, domain):
+        """Like get(), but return the payload pre-encoded as a JSONFragment."""
+        payload = self.get(domain)
+        return self._fragments[id(payload)] if payload is not None else None
+
+    def stats(self):
+        """Size, build time and generation of this snapshot."""
+        return {
+            'generation': self.generation,
+            'datasetGeneration': self.stamp,
+            'domains': len(self._payloads),
+            'companies': self.company_count,
+            'buildTimeMs': round(self.build_seconds * 1000, 2),
+            'builtAt': self.built_at.isoformat(),
+        }
+
+    @classmethod
+    def build(cls, stamp, generation):
+        """Load every indexed company from its stored document, serializing only those without one."""
+        from .models import Company, CompanyDomain
+        from .serializers import CompanySerializer
+
+        started = time.perf_counter()
+
+        indexed = Company.objects.filter(domain_entries__isnull=False).distinct()
+        documents = {}
+        rendered = indexed.exclude(document='').values_list('id', 'document')
+        for company_id, document in rendered.iterator(chunk_size=2000):
+            documents[company_id] = json.loads(document)
+        unrendered = indexed.filter(document='').prefetch_related(Company.prefetch_alternatives())
+        for company in unrendered.iterator(chunk_size=2000):
+            documents[company.pk] = dict(CompanySerializer(company).data)
+
+        payloads = {}
+        for domain, company_id in CompanyDomain.objects.values_list('domain', 'company_id').iterator(chunk_size=5000):
+            payload = documents.get(company_id)
+            if payload is not None:
+                payloads[domain] = payload
+
+        return cls(
+            payloads,
+            stamp=stamp,
+            generation=generation,
+            build_seconds=time.perf_counter() - started,
+            company_count=len(documents),
+        )
+
+
+class DomainFilterSnapshot:
+    """
+    Bloom filter over every indexed company domain.
+    might_exist() is False only for domains (and all their parents) that are definitely unknown.
+    The same filter is published to clients as a binary artifact; its ETag is a hash of the
+    bytes, so every worker holding the same data serves the same tag.
+    """
+
+    def __init__(self, bloom, stamp, generation, build_seconds, false_positive_rate, data_version=None):
+        self.bloom = bloom
+        self.data_version = data_version
+        self.artifact = bloom.to_bytes()
+        self.etag = hashlib.sha256(self.artifact).hexdigest()[:32]
+        self.stamp = stamp
+        self.generation = generation
+        self.build_seconds = build_seconds
+        self.false_positive_rate = false_positive_rate
+        self.built_at = timezone.now()
+
+    def __len__(self):
+        return self.bloom.item_count
+
+    def might_exist(self, domain):
+        """False if neither the normalized domain nor any registrable parent is indexed."""
+        return self.bloom.might_contain_any(candidate_domains(domain))
+
+    def stats(self):
+        stats = self.bloom.stats()
+        stats.update({
+            'generation': self.generation,
+            'datasetGeneration': self.stamp,
+            'etag': self.etag,
+            'targetFalsePositiveRate': self.false_positive_rate,
+            'buildTimeMs': round(self.build_seconds * 1000, 2),
+            'builtAt': self.built_at.isoformat(),
+        })
+        return stats
+
+    @classmethod
+    def build(cls, stamp, generation):
+        from .models import CompanyDomain, DataVersion
+
+        started = time.perf_counter()
+        current_version = DataVersion.get_current_version()
+        domains = list(CompanyDomain.objects.values_list('domain', flat=True).iterator(chunk_size=5000))
+        false_positive_rate = settings.DOMAIN_FILTER_FALSE_POSITIVE_RATE
+        bloom = BloomFilter.for_capacity(BloomFilter.capacity_bucket(len(domains)), false_positive_rate)
+        for domain in domains:
+            bloom.add(domain)
+
+        snapshot = cls(
+            bloom,
+            stamp=stamp,
+            generation=generation,
+            build_seconds=time.perf_counter() - started,
+            false_positive_rate=false_positive_rate,
+            data_version=current_version.version if current_version else None,
+        )
+        # Keep recent artifacts around so clients can fetch deltas from older versions
+        cache.set(filter_artifact_cache_key(snapshot.etag), snapshot.artifact, settings.DOMAIN_FILTER_HISTORY_TIMEOUT)
+        return snapshot
+
+
+def filter_artifact_cache_key(etag):
+    return 'domain-filter:artifact:{}'.format(etag)
+
+
+class SnapshotHolder:
+    """
+    Holds the current snapshot for this worker.
+    The dataset generation (see companies.cache) is checked at most once per check interval;
+    when it has changed a new snapshot is built and swapped in with a single reference assignment.
+    Readers never block on a rebuild once a snapshot exists.
+    """
+
+    def __init__(self, snapshot_class):
+        self.snapshot_class = snapshot_class
+        self._snapshot = None
+        self._generation = 0
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the current snapshot, refreshing it if the generation moved. May return None."""
+        if self._snapshot is None or time.monotonic() >= self._next_check:
+            self.refresh()
+        return self._snapshot
+
+    def get_current(self, wait=False):
+        """
+        Return the snapshot only if it was built from the current dataset generation, else None.
+        A stale snapshot is rebuilt right away rather than after the check interval; when
+        another thread is already rebuilding it, wait for it (wait=True) or return None.
+        Responses cached under the current generation must only be computed from these.
+        """
+        from .cache import get_generation
+
+        stamp = get_generation()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.stamp != stamp:
+            snapshot = self.refresh(wait=wait)
+        if snapshot is None or snapshot.stamp != stamp:
+            return None
+        return snapshot
+
+    def refresh(self, force=False, wait=False):
+        """
+        Rebuild the snapshot if the dataset generation changed (or always, with force).
+        Returns the current snapshot without waiting when another thread is rebuilding it,
+        unless there is none yet or wait is set.
+        """
+        blocking = wait or self._snapshot is None
+        if not self._lock.acquire(blocking=blocking):
+            return self._snapshot
+
+        try:
+            self._next_check = time.monotonic() + settings.DOMAIN_SNAPSHOT_CHECK_INTERVAL
+            from .cache import get_generation
+            stamp = get_generation()
+            current = self._snapshot
+            if not force and current is not None and current.stamp == stamp:
+                return current
+
+            generation = self._generation + 1
+            snapshot = self.snapshot_class.build(stamp=stamp, generation=generation)
+            self._generation = generation
+            self._snapshot = snapshot
+            logger.info(
+                "Built %s generation %s: %s entries in %.1f ms",
+                self.snapshot_class.__name__, generation, len(snapshot), snapshot.build_seconds * 1000
+            )
+            return snapshot
+        except Exception:
+            logger.exception("Failed to build %s", self.snapshot_class.__name__)
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def reset(self):
+        """Drop the current snapshot (used by tests)."""
+        with self._lock:
+            self._snapshot = None
+            self._next_check = 0.0
+
+    def stats(self):
+        """Stats of the current snapshot without triggering a build."""
+        snapshot = self._snapshot
+        return snapshot.stats() if snapshot is not None else None
+
+
+domain_snapshot = SnapshotHolder(DomainSnapshot)
+domain_filter = SnapshotHolder(DomainFilterSnapshot)
+
+
+def get_domain_snapshot():
+    """
+    Return the worker's domain snapshot, or None when disabled, unavailable or built from
+    an older dataset generation (callers then read the database).
+    """
+    if not settings.DOMAIN_SNAPSHOT_ENABLED:
+        return None
+    return domain_snapshot.get_current()
+
+
+def get_domain_filter():
+    """
+    Return the worker's domain Bloom filter, or None when disabled, unavailable or built
+    from an older dataset generation (it would reject domains added since).
+    """
+    if not settings.DOMAIN_FILTER_ENABLED:
+        return None
+    return domain_filter.get_current()
+
+
+def warm_domain_snapshot():
+    """Build the snapshot and filter eagerly at worker start so the first request is fast."""
+    if settings.DOMAIN_SNAPSHOT_ENABLED:
+        domain_snapshot.refresh()
+    if settings.DOMAIN_FILTER_ENABLED:
+        domain_filter.refresh()
@@ -0,0 +1,143 @@
+"""
+Search-as-you-type suggestions (GET /api/companies/suggest?prefix=).
+Each worker keeps a sorted array of case-folded company names, name words and
+domains, rebuilt when the dataset generation changes, so keystrokes never
+reach the database.
+"""
+
+import heapq
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from .domains import normalize_domain
+from .names import fold
+from .snapshot import SnapshotHolder
+
+# Results for prefixes up to this length are precomputed (SUGGEST_MAX_LIMIT of them);
+# their key ranges are too wide to rank per request
+PRECOMPUTED_PREFIX_LENGTH = 3
+_RANGE_END = '\U0010ffff'
+
+
+def normalize_prefix(prefix):
+    """Fold a typed prefix like the index keys; a leading www. is dropped as in domains."""
+    folded = fold(prefix.strip())
+    if folded.startswith('www.'):
+        folded = folded[4:]
+    return folded
+
+
+class SuggestIndex:
+    """
+    Sorted keys (the stored name key, each later word of it, each domain) pointing at
+    companies ranked by popularity: most referenced as a carbon neutral alternative first,
+    then approved before unapproved, then shorter and alphabetically earlier names.
+    A company matching a prefix through several keys is suggested once.
+    Immutable once built.
+    """
+
+    def __init__(self, keys, key_ranks, suggestions, stamp, generation, build_seconds):
+        self._keys = keys
+        self._key_ranks = key_ranks
+        # rank → suggestion payload; rank 0 is the most popular company
+        self._suggestions = suggestions
+        self._top = self._precompute_top(keys, key_ranks)
+        self.stamp = stamp
+        self.generation = generation
+        self.build_seconds = build_seconds
+        self.built_at = timezone.now()
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _precompute_top(keys, key_ranks):
+        """Best SUGGEST_MAX_LIMIT ranks for every prefix of up to PRECOMPUTED_PREFIX_LENGTH characters."""
+        top = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            start = 0
+            while start < len(keys):
+                if len(keys[start]) < length:
+                    start += 1
+                    continue
+                prefix = keys[start][:length]
+                end = bisect_left(keys, prefix + _RANGE_END, start)
+                top[prefix] = heapq.nsmallest(settings.SUGGEST_MAX_LIMIT, set(key_ranks[start:end]))
+                start = end
+        return top
+
+    def suggest(self, prefix, limit):
+        """Up to limit suggestions for an already normalized prefix, most popular first."""
+        if not prefix or limit <= 0:
+            return []
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            ranks = self._top.get(prefix, ())[:limit]
+        else:
+            start = bisect_left(self._keys, prefix)
+            end = bisect_left(self._keys, prefix + _RANGE_END, start)
+            ranks = heapq.nsmallest(limit, set(self._key_ranks[start:end]))
+        return [self._suggestions[rank] for rank in ranks]
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'datasetGeneration': self.stamp,
+            'companies': len(self._suggestions),
+            'keys': len(self._keys),
+            'buildTimeMs': round(self.build_seconds * 1000, 2),
+            'builtAt': self.built_at.isoformat(),
+        }
+
+    @classmethod
+    def build(cls, stamp, generation):
+        from .models import Company, CompanyDomain
+
+        started = time.perf_counter()
+        rows = list(
+            Company.objects.annotate(references=Count('alternative_for_relationships'))
+            .values_list('id', 'company', 'name_key', 'domains', 'carbon_neutral', 'is_approved', 'references')
+        )
+        rows.sort(key=lambda row: (-row[6], not row[5], len(row[1]), row[2], row[0]))
+
+        suggestions = []
+        rank_of = {}
+        pairs = []
+        for rank, (company_id, name, key, domains, carbon_neutral, _, _) in enumerate(rows):
+            rank_of[company_id] = rank
+            suggestions.append({
+                'company': name,
+                'domain': domains[0] if domains else None,
+                'carbon_neutral': carbon_neutral,
+            })
+            # Company.name_key is already folded
+            pairs.append((key, rank))
+            words = key.split()
+            for position in range(1, len(words)):
+                pairs.append((' '.join(words[position:]), rank))
+
+        for domain, company_id in CompanyDomain.objects.values_list('domain', 'company_id').iterator(chunk_size=5000):
+            rank = rank_of.get(company_id)
+            if rank is not None:
+                pairs.append((normalize_domain(domain), rank))
+
+        pairs.sort()
+        return cls(
+            [key for key, _ in pairs],
+            [rank for _, rank in pairs],
+            suggestions,
+            stamp=stamp,
+            generation=generation,
+            build_seconds=time.perf_counter() - started,
+        )
+
+
+suggest_index = SnapshotHolder(SuggestIndex)
+
+
+def warm_suggest_index():
+    """Build the suggestion index at worker start so the first keystroke is fast."""
+    suggest_index.refresh()
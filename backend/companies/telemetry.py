@@ -0,0 +1,115 @@
+"""
+Write-behind buffering of domain-miss telemetry.
+Misses are counted in memory per process and flushed to CompanyRequest as one
+bulk upsert every few seconds or once enough distinct domains have piled up,
+so lookups for unknown domains stay read-only.
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+from .domains import normalize_domain, registrable_domain
+
+logger = logging.getLogger(__name__)
+
+
+class MissBuffer:
+    """
+    Per-process buffer of registrable domain → miss count.
+    A daemon thread performs the flushes; request threads only touch the counter.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.flushed_batches = 0
+        self.flushed_misses = 0
+
+    def __len__(self):
+        return len(self._counts)
+
+    def record(self, domains):
+        """Count one miss for each domain in the iterable."""
+        normalized = [registrable_domain(normalize_domain(domain)) for domain in domains]
+        with self._lock:
+            for domain in normalized:
+                if domain:
+                    self._counts[domain] += 1
+            pending = len(self._counts)
+
+        self._ensure_flusher()
+        if pending >= settings.MISS_BUFFER_MAX_ENTRIES:
+            self._wake.set()
+
+    def flush(self):
+        """Write all buffered counts with one upsert. Returns the number of domains written."""
+        from .models import CompanyRequest
+
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return 0
+
+        try:
+            CompanyRequest.increment_counts(counts)
+        except Exception:
+            logger.exception("Failed to flush %s buffered domain misses", len(counts))
+            with self._lock:
+                self._counts.update(counts)
+            return 0
+
+        self.flushed_batches += 1
+        self.flushed_misses += sum(counts.values())
+        return len(counts)
+
+    def stats(self):
+        return {
+            'pendingDomains': len(self._counts),
+            'flushedBatches': self.flushed_batches,
+            'flushedMisses': self.flushed_misses,
+        }
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='miss-buffer-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.MISS_BUFFER_FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                # Background thread owns its own connection; don't keep it open between flushes
+                connection.close()
+
+
+miss_buffer = MissBuffer()
+
+
+def record_misses(domains):
+    """Record domain misses, buffered or immediately depending on MISS_BUFFER_ENABLED."""
+    if settings.MISS_BUFFER_ENABLED:
+        miss_buffer.record(domains)
+    else:
+        from .models import CompanyRequest
+        CompanyRequest.record_requests(domains)
+
+
+@atexit.register
+def _flush_on_shutdown():
+    try:
+        miss_buffer.flush()
+    except Exception:
+        logger.exception("Failed to flush domain misses on shutdown")
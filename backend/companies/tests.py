@@ -1,8 +1,44 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Company, DataVersion
+from .bloom import BloomFilter, apply_delta
+from .cache import (
+    acquire_lock, bump_generation, cache_counters, cache_stats, get_cache, get_generation, release_lock,
+    response_cache_key,
+)
+from .domains import DomainTrie, registrable_domain
+from .languages import language_from_header, select_description
+from .names import name_key
+from .search import full_text_index, trigram_index, trigrams
+from .models import Company, CompanyAlternative, CompanyDomain, CompanyRequest, CompanyTombstone, DataVersion
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder as DRFJSONEncoder
+from rest_framework.views import APIView
+from .renderers import FastJSONRenderer, JSONFragment, dumps
+from .serializers import (
+    CompanyListRowSerializer, CompanyListSerializer, CompanySearchRowSerializer,
+    CompanySearchSerializer, CompanySerializer,
+)
+from .snapshot import DomainSnapshot, domain_filter, domain_snapshot
+from .suggest import suggest_index
+from .telemetry import miss_buffer
 
 
 class CompanyModelTest(TestCase):
@@ -168,4 +204,1483 @@ class DataVersionModelTest(TestCase):
         DataVersion.objects.create(version='2.0.0')
         
         current = DataVersion.get_current_version()
-        self.assertEqual(current.version, '2.0.0')  # Most recent
\ No newline at end of file
+        self.assertEqual(current.version, '2.0.0')  # Most recent
+
+
+class CompanyDomainIndexTest(TestCase):
+    """Test cases for the normalized domain index."""
+    
+    def setUp(self):
+        self.company = Company.objects.create(
+            domains=['WWW.Example.com', 'example.org'],
+            company='Example Corp'
+        )
+    
+    def test_index_created_on_save(self):
+        """Saving a company writes one normalized row per domain."""
+        domains = set(CompanyDomain.objects.filter(company=self.company).values_list('domain', flat=True))
+        self.assertEqual(domains, {'example.com', 'example.org'})
+    
+    def test_index_follows_domain_edits(self):
+        """Removed domains are dropped and new ones are indexed."""
+        self.company.domains = ['example.net']
+        self.company.save()
+        
+        self.assertIsNone(Company.find_by_domain('example.com'))
+        self.assertEqual(Company.find_by_domain('www.example.net'), self.company)
+    
+    def test_find_by_domain_single_query(self):
+        """Lookups are a single indexed query."""
+        with self.assertNumQueries(1):
+            self.assertEqual(Company.find_by_domain('EXAMPLE.org'), self.company)
+    
+    def test_first_owner_keeps_domain(self):
+        """A domain claimed by another company keeps its original owner."""
+        other = Company.objects.create(domains=['example.com'], company='Other Corp')
+        
+        self.assertEqual(Company.find_by_domain('example.com'), self.company)
+        self.assertFalse(CompanyDomain.objects.filter(company=other).exists())
+    
+    def test_rebuild_index(self):
+        """Bulk-created companies are picked up by a rebuild."""
+        Company.objects.bulk_create([Company(domains=['bulk.com'], company='Bulk Co')])
+        self.assertIsNone(Company.find_by_domain('bulk.com'))
+        
+        CompanyDomain.rebuild_index()
+        self.assertEqual(Company.find_by_domain('bulk.com').company, 'Bulk Co')
+
+
+class DomainSnapshotTest(APITestCase):
+    """Test cases for the in-process domain snapshot."""
+    
+    def setUp(self):
+        cache.clear()
+        domain_snapshot.reset()
+        domain_filter.reset()
+        DataVersion.objects.create(version='1.0.0')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company = Company.objects.create(
+                domains=['snap.com', 'www.snap.net'],
+                company='Snap Co',
+                carbon_neutral=True
+            )
+    
+    def test_snapshot_contents(self):
+        """Every normalized domain maps to the serialized company."""
+        snapshot = domain_snapshot.get()
+        
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(snapshot.get('snap.net')['company'], 'Snap Co')
+        self.assertEqual(snapshot.stats()['companies'], 1)
+    
+    def test_hit_served_without_queries(self):
+        """A warm snapshot answers the domain endpoint without touching the database."""
+        domain_snapshot.get()
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'WWW.snap.com'})
+        
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600), self.assertNumQueries(0):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['company'], 'Snap Co')
+    
+    def test_rebuilt_when_stamp_changes(self):
+        """Company edits touch the data version and produce a new generation."""
+        first = domain_snapshot.get()
+        self.company.company = 'Snap Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.save()
+        
+        second = domain_snapshot.refresh()
+        self.assertEqual(second.generation, first.generation + 1)
+        self.assertEqual(second.get('snap.com')['company'], 'Snap Renamed')
+    
+    def test_stale_snapshot_never_served(self):
+        """After a bump the old snapshot isn't served, so no stale payload is cached under the new generation."""
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'snap.com'})
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600):
+            self.assertEqual(self.client.get(url).json()['sector'], None)
+            self.company.sector = 'Energy'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.company.save()
+            
+            response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(response.json()['sector'], 'Energy')
+            self.assertEqual(self.client.get(url).json()['sector'], 'Energy')
+        self.assertEqual(domain_snapshot.get().stamp, get_generation())
+
+
+class SubdomainResolutionTest(TestCase):
+    """Test cases for subdomain → registrable domain resolution."""
+    
+    def test_trie_longest_suffix(self):
+        """The trie returns the longest indexed parent domain."""
+        trie = DomainTrie()
+        trie.add('google.com', 'google')
+        trie.add('maps.google.com', 'maps')
+        trie.add('unilever.com.tr', 'unilever')
+        
+        self.assertEqual(trie.resolve('mail.google.com'), ('google.com', 'google'))
+        self.assertEqual(trie.resolve('a.maps.google.com'), ('maps.google.com', 'maps'))
+        self.assertEqual(trie.resolve('shop.unilever.com.tr'), ('unilever.com.tr', 'unilever'))
+        self.assertIsNone(trie.resolve('other.com.tr'))
+    
+    def test_public_suffix_never_indexed(self):
+        """Public suffixes such as com.tr can't match on their own."""
+        trie = DomainTrie()
+        self.assertFalse(trie.add('com.tr', 'bogus'))
+        self.assertIsNone(trie.resolve('example.com.tr'))
+        self.assertEqual(registrable_domain('shop.example.com.tr'), 'example.com.tr')
+    
+    def test_find_by_domain_subdomain(self):
+        """Subdomains resolve to the company in one query."""
+        company = Company.objects.create(domains=['facebook.com'], company='Meta')
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(Company.find_by_domain('m.facebook.com'), company)
+        self.assertIsNone(Company.find_by_domain('m.facebook.com', include_parents=False))
+    
+    def test_miss_recorded_under_registrable_domain(self):
+        """Unknown subdomains are recorded once under their registrable domain."""
+        CompanyRequest.record_request('shop.unknown.com.tr')
+        CompanyRequest.record_request('www.unknown.com.tr')
+        
+        request = CompanyRequest.objects.get()
+        self.assertEqual(request.domain, 'unknown.com.tr')
+        self.assertEqual(request.request_count, 2)
+
+
+class DomainLookupViewTest(APITestCase):
+    """Test cases for POST /api/companies/domains/lookup."""
+    
+    def setUp(self):
+        miss_buffer.flush()
+        cache.clear()
+        domain_snapshot.reset()
+        domain_filter.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=['google.com'], company='Google', carbon_neutral=True)
+            Company.objects.create(domains=['arcelik.com.tr'], company='Arçelik')
+        self.url = reverse('companies:company-domain-lookup')
+    
+    def test_bulk_lookup(self):
+        """Hits map to summaries, misses to null and are recorded once."""
+        response = self.client.post(self.url, {
+            'domains': ['mail.google.com', 'www.arcelik.com.tr', 'unknown.com', 'www.unknown.com']
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(results['mail.google.com']['company'], 'Google')
+        self.assertEqual(results['www.arcelik.com.tr']['company'], 'Arçelik')
+        self.assertEqual(set(results['mail.google.com']), {'domain', 'domains', 'company', 'carbon_neutral', 'renewable_share_percent'})
+        self.assertIsNone(results['unknown.com'])
+        miss_buffer.flush()
+        self.assertEqual(CompanyRequest.objects.get(domain='unknown.com').request_count, 1)
+    
+    def test_stale_filter_not_trusted(self):
+        """Domains added after the filter was built are found, not reported as misses."""
+        domain_filter.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=['fresh.com'], company='Fresh Co')
+        
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600, DOMAIN_SNAPSHOT_ENABLED=False):
+            self.assertFalse(domain_filter.get().might_exist('fresh.com'))
+            response = self.client.post(self.url, {'domains': ['fresh.com']}, format='json')
+        
+        self.assertEqual(response.data['results']['fresh.com']['company'], 'Fresh Co')
+        miss_buffer.flush()
+        self.assertFalse(CompanyRequest.objects.filter(domain='fresh.com').exists())
+    
+    @override_settings(DOMAIN_SNAPSHOT_ENABLED=False, DOMAIN_FILTER_ENABLED=False)
+    def test_constant_queries_without_snapshot(self):
+        """A batch costs one lookup query whatever its size; misses are written in one flush."""
+        domains = ['google.com', 'arcelik.com.tr'] + [f'missing{i}.com' for i in range(50)]
+        
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'domains': domains}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        with self.assertNumQueries(1):
+            miss_buffer.flush()
+        self.assertEqual(CompanyRequest.objects.count(), 50)
+    
+    def test_rejects_invalid_payloads(self):
+        """Non-lists and oversized batches are rejected."""
+        response = self.client.post(self.url, {'domains': 'google.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(self.url, {'domains': ['a.com'] * 501}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(DOMAIN_SNAPSHOT_ENABLED=False)
+class DomainFilterTest(APITestCase):
+    """Test cases for the Bloom-filter negative cache."""
+    
+    def setUp(self):
+        miss_buffer.flush()
+        cache.clear()
+        domain_filter.reset()
+        DataVersion.objects.create(version='1.0.0')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company = Company.objects.create(domains=['known.com'], company='Known Co')
+    
+    def test_bloom_filter_basics(self):
+        """Added items are always found and sizing follows the target rate."""
+        bloom = BloomFilter.for_capacity(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'domain{i}.com')
+        
+        self.assertTrue(all(f'domain{i}.com' in bloom for i in range(1000)))
+        false_positives = sum(f'other{i}.org' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertLess(bloom.memory_bytes, 1300)
+    
+    def test_definite_miss_skips_company_queries(self):
+        """Unknown domains are rejected before any company lookup."""
+        domain_filter.get()
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'unknown.com'})
+        
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        
+        touched = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('companies_company"', touched)
+        self.assertNotIn('companies_companydomain', touched)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        miss_buffer.flush()
+        self.assertTrue(CompanyRequest.objects.filter(domain='unknown.com').exists())
+    
+    def test_stale_filter_not_trusted(self):
+        """A filter from an older generation doesn't reject domains added since it was built."""
+        domain_filter.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=['fresh.com'], company='Fresh Co')
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'fresh.com'})
+        
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600, DOMAIN_SNAPSHOT_ENABLED=False):
+            self.assertFalse(domain_filter.get().might_exist('fresh.com'))
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['company'], 'Fresh Co')
+    
+    def test_subdomain_of_known_domain_passes(self):
+        """Subdomains of indexed domains are not rejected."""
+        self.assertTrue(domain_filter.get().might_exist('shop.known.com'))
+        
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'shop.known.com'})
+        response = self.client.get(url)
+        self.assertEqual(response.json()['company'], 'Known Co')
+
+
+class DomainFilterDownloadTest(APITestCase):
+    """Test cases for GET /api/data/domain-filter."""
+    
+    def setUp(self):
+        cache.clear()
+        domain_filter.reset()
+        DataVersion.objects.create(version='1.0.0')
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=['known.com'], company='Known Co')
+        self.url = reverse('companies:data-domain-filter')
+    
+    def test_full_download_and_conditional_get(self):
+        """The artifact loads as a filter and unchanged data returns 304."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Filter-Format'], 'full')
+        self.assertEqual(response['X-Data-Version'], '1.0.0')
+        self.assertIn('known.com', BloomFilter.from_bytes(response.content))
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_delta_between_versions(self):
+        """A client holding an older filter receives a small delta."""
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Data-Generation'], str(get_generation()))
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=['added.com'], company='Added Co')
+        domain_filter.refresh()
+        
+        response = self.client.get(self.url, {'base': first['ETag'].strip('"')})
+        self.assertEqual(response['X-Data-Version'], first['X-Data-Version'])
+        self.assertEqual(response['X-Data-Generation'], str(get_generation()))
+        self.assertNotEqual(response['X-Data-Generation'], first['X-Data-Generation'])
+        self.assertEqual(response['X-Filter-Format'], 'delta')
+        self.assertLess(len(response.content), len(first.content))
+        
+        updated = BloomFilter.from_bytes(apply_delta(first.content, response.content))
+        self.assertIn('added.com', updated)
+        self.assertIn('known.com', updated)
+
+
+class CompanyRequestUpsertTest(TestCase):
+    """Test cases for atomic miss recording."""
+    
+    def test_single_statement_upsert(self):
+        """Recording an existing domain is one statement that adds to the count."""
+        CompanyRequest.record_request('hot.com')
+        
+        with self.assertNumQueries(1):
+            CompanyRequest.record_request('hot.com')
+        self.assertEqual(CompanyRequest.objects.get(domain='hot.com').request_count, 2)
+    
+    def test_increment_counts_batch(self):
+        """Batch counts are added on top of existing rows."""
+        CompanyRequest.record_request('a.com')
+        CompanyRequest.increment_counts({'a.com': 5, 'b.com': 3})
+        
+        counts = dict(CompanyRequest.objects.values_list('domain', 'request_count'))
+        self.assertEqual(counts, {'a.com': 6, 'b.com': 3})
+    
+    def test_fallback_without_upsert_support(self):
+        """Databases without ON CONFLICT use the UPDATE/INSERT path."""
+        with mock.patch.object(CompanyRequest, '_supports_upsert', return_value=False):
+            CompanyRequest.record_request('legacy.com')
+            CompanyRequest.increment_counts({'legacy.com': 2})
+        
+        self.assertEqual(CompanyRequest.objects.get(domain='legacy.com').request_count, 3)
+
+
+@override_settings(DOMAIN_SNAPSHOT_ENABLED=False, DOMAIN_FILTER_ENABLED=False)
+class MissBufferTest(APITestCase):
+    """Test cases for write-behind miss telemetry."""
+    
+    def setUp(self):
+        miss_buffer.flush()
+        cache.clear()
+    
+    def test_misses_are_read_only_until_flush(self):
+        """Unknown-domain requests don't write; a flush writes one row per domain."""
+        for i in range(5):
+            url = reverse('companies:company-by-domain', kwargs={'domain': f'hot{i % 2}.com'})
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertFalse(any(q['sql'].startswith(('INSERT', 'UPDATE')) for q in queries.captured_queries))
+        
+        self.assertEqual(CompanyRequest.objects.count(), 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(miss_buffer.flush(), 2)
+        
+        counts = dict(CompanyRequest.objects.values_list('domain', 'request_count'))
+        self.assertEqual(counts, {'hot0.com': 3, 'hot1.com': 2})
+    
+    @override_settings(MISS_BUFFER_ENABLED=False)
+    def test_unbuffered_mode_writes_immediately(self):
+        """With buffering disabled misses are recorded inside the request."""
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'now.com'})
+        self.client.get(url)
+        self.assertTrue(CompanyRequest.objects.filter(domain='now.com').exists())
+
+
+class SharedResponseCacheTest(APITestCase):
+    """Test cases for the shared response cache."""
+    
+    def setUp(self):
+        cache.clear()
+        cache_counters.reset()
+        Company.objects.create(domains=['cached.com'], company='Cached Co')
+    
+    def test_second_request_is_a_hit(self):
+        """Identical requests are served from the cache and counted."""
+        url = reverse('companies:company-list')
+        first = self.client.get(url, {'limit': 10, 'offset': 0})
+        
+        with self.assertNumQueries(0):
+            second = self.client.get(url, {'offset': 0, 'limit': 10})  # Same query, different order
+        
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(cache_stats()['hitRatio'], 0.5)
+    
+    def test_hit_does_not_write_to_shared_cache(self):
+        """Hits are counted in process; the shared cache is only read."""
+        url = reverse('companies:company-list')
+        self.client.get(url)
+        with mock.patch.object(cache, 'set') as cache_set, mock.patch.object(cache, 'incr') as cache_incr, \
+                mock.patch.object(cache, 'add') as cache_add:
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        cache_set.assert_not_called()
+        cache_incr.assert_not_called()
+        cache_add.assert_not_called()
+        self.assertEqual(cache_stats()['hits'], 1)
+    
+    def test_function_view_cached(self):
+        """The data version endpoint is cached as well."""
+        url = reverse('companies:data-version')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+
+class CacheGenerationTest(APITestCase):
+    """Test cases for generation-stamped cache invalidation."""
+    
+    def setUp(self):
+        cache.clear()
+        # Run the on-commit generation bump, as a committed request would
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company = Company.objects.create(domains=['gen.com'], company='Gen Co')
+    
+    def test_company_save_invalidates_cached_responses(self):
+        """Saving a company bumps the generation and the next request is a miss."""
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'gen.com'})
+        with override_settings(DOMAIN_SNAPSHOT_ENABLED=False):
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+            
+            self.company.company = 'Gen Renamed'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.company.save()
+            response = self.client.get(url)
+        
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['company'], 'Gen Renamed')
+    
+    def test_generation_bumped_once_on_commit(self):
+        """Saves bump the generation once per committed transaction and not at all on rollback."""
+        before = get_generation()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.company.company = 'Gen Renamed'
+            self.company.save()
+            CompanyAlternative.objects.create(
+                from_company=self.company,
+                to_company=Company.objects.create(domains=['green.com'], company='Green', carbon_neutral=True),
+            )
+        self.assertEqual(get_generation(), before)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(get_generation(), before + 1)
+    
+    def test_rolled_back_save_keeps_generation(self):
+        """A save that is rolled back never moves the generation."""
+        before = get_generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.company.company = 'Never Committed'
+                    self.company.save()
+                    raise RuntimeError('roll back')
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(get_generation(), before)
+        self.assertEqual(DataVersion.current_generation(), before)
+    
+    def test_refresh_endpoint_bumps_generation(self):
+        """POST /api/data/refresh invalidates cached responses."""
+        before = get_generation()
+        self.client.post(reverse('companies:data-refresh'))
+        self.assertEqual(get_generation(), before + 1)
+        self.assertEqual(DataVersion.current_generation(), before + 1)
+    
+    def test_generation_survives_cache_loss(self):
+        """The generation is reloaded from DataVersion and never goes backwards."""
+        generation = bump_generation()
+        cache.clear()
+        self.assertEqual(get_generation(), generation)
+        self.assertEqual(bump_generation(), generation + 1)
+    
+    def test_client_max_age_is_short(self):
+        """Clients are told to cache for CACHE_CLIENT_MAX_AGE, not the server-side timeout."""
+        with override_settings(API_CACHE_CLIENT_MAX_AGE=120):
+            response = self.client.get(reverse('companies:company-list'))
+        self.assertIn('max-age=120', response['Cache-Control'])
+
+
+class CacheCoalescingTest(APITestCase):
+    """Test cases for stale-while-revalidate and request coalescing."""
+    
+    def setUp(self):
+        cache.clear()
+        cache_counters.reset()
+        Company.objects.create(domains=['herd.com'], company='Herd Co')
+        self.url = reverse('companies:company-list')
+        self.key = response_cache_key('view', RequestFactory().get(self.url))
+        self.lock_key = self.key + ':lock'
+    
+    def expire_entry(self):
+        content, content_type, _ = cache.get(self.key)
+        cache.set(self.key, (content, content_type, 0), 600)
+    
+    def test_stale_served_while_another_request_recomputes(self):
+        """An expired entry is served without queries when the recompute lock is taken."""
+        self.client.get(self.url)
+        self.expire_entry()
+        cache.add(self.lock_key, 1)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(cache_stats()['staleHits'], 1)
+    
+    def test_expired_entry_recomputed_by_lock_holder(self):
+        """The request that wins the lock recomputes the entry and releases the lock."""
+        self.client.get(self.url)
+        self.expire_entry()
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertGreater(cache.get(self.key)[2], 0)
+        self.assertIsNone(cache.get(self.lock_key))
+    
+    def test_cold_miss_waits_for_lock_holder(self):
+        """Without an entry, concurrent requests wait for the one computing it."""
+        cache.add(self.lock_key, 1)
+        entry = (b'{"results": []}', 'application/json', float('inf'))
+        threading.Timer(0.1, cache.set, args=(self.key, entry, 600)).start()
+        
+        with override_settings(API_CACHE_LOCK_WAIT=5), self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.content, entry[0])
+    
+    def test_wait_gives_up_after_lock_wait(self):
+        """A stuck lock holder doesn't block other requests forever."""
+        cache.add(self.lock_key, 1)
+        
+        with override_settings(API_CACHE_LOCK_WAIT=0.1):
+            response = self.client.get(self.url)
+        
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class FileCacheLockTest(APITestCase):
+    """Test cases for the coalescing lock on the file cache backend."""
+    
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        file_cache = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory,
+        }})
+        file_cache.enable()
+        self.addCleanup(file_cache.disable)
+        Company.objects.create(domains=['file.com'], company='File Co')
+        self.url = reverse('companies:company-list')
+        self.key = response_cache_key('view', RequestFactory().get(self.url))
+        self.lock_key = self.key + ':lock'
+    
+    def test_lock_is_exclusive_across_threads(self):
+        """Exactly one of many concurrent acquirers wins, and the lock can be taken after release."""
+        results = []
+        barrier = threading.Barrier(8)
+        
+        def contend():
+            barrier.wait()
+            results.append(acquire_lock(self.lock_key, 30))
+        
+        threads = [threading.Thread(target=contend) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+        
+        release_lock(self.lock_key)
+        self.assertTrue(acquire_lock(self.lock_key, 30))
+    
+    def test_expired_lock_is_taken_over(self):
+        """A lock left behind by a dead holder expires after its timeout."""
+        self.assertTrue(acquire_lock(self.lock_key, 30))
+        self.assertFalse(acquire_lock(self.lock_key, 30))
+        path = os.path.join(get_cache()._dir, hashlib.md5(self.lock_key.encode('utf-8')).hexdigest() + '.lock')
+        os.utime(path, (0, 0))
+        self.assertTrue(acquire_lock(self.lock_key, 30))
+    
+    def test_stale_served_while_lock_held(self):
+        """Requests that lose the lock get the expired entry instead of recomputing."""
+        self.client.get(self.url)
+        content, content_type, _ = get_cache().get(self.key)
+        get_cache().set(self.key, (content, content_type, 0), 600)
+        self.assertTrue(acquire_lock(self.lock_key, 30))
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'STALE')
+        
+        release_lock(self.lock_key)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+
+class KeysetPaginationTest(APITestCase):
+    """Test cases for cursor pagination on the company list."""
+    
+    def setUp(self):
+        cache.clear()
+        # Duplicate names make sure ties are broken by id
+        for name in ['Beta', 'Alpha', 'Gamma', 'Beta', 'Delta']:
+            Company.objects.create(company=name)
+        self.url = reverse('companies:company-list')
+    
+    def collect_pages(self, limit):
+        names, pages = [], 0
+        response = self.client.get(self.url, {'pagination': 'cursor', 'limit': limit})
+        while True:
+            names += [row['company'] for row in response.data['results']]
+            pages += 1
+            if not response.data['next']:
+                return names, pages
+            response = self.client.get(response.data['next'])
+    
+    def test_walks_every_row_once(self):
+        """Following next links returns every company once, in (company, id) order."""
+        names, pages = self.collect_pages(limit=2)
+        
+        self.assertEqual(names, ['Alpha', 'Beta', 'Beta', 'Delta', 'Gamma'])
+        self.assertEqual(pages, 3)
+    
+    def test_page_cost_independent_of_depth(self):
+        """Deep pages run a single query and no COUNT(*) unless asked for."""
+        first = self.client.get(self.url, {'pagination': 'cursor', 'limit': 2})
+        self.assertIsNone(first.data['count'])
+        
+        with self.assertNumQueries(1):
+            self.client.get(first.data['next'])
+    
+    def test_count_is_optional_and_cached(self):
+        """?count=true adds the total, computed once per dataset generation."""
+        params = {'pagination': 'cursor', 'limit': 2, 'count': 'true'}
+        self.assertEqual(self.client.get(self.url, params).data['count'], 5)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {**params, 'limit': 3})
+        self.assertEqual(response.data['count'], 5)
+    
+    def test_invalid_cursor(self):
+        """A malformed cursor is a 404, like DRF's own cursor pagination."""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_offset_pagination_unchanged(self):
+        """Without the opt-in the list keeps its limit/offset response."""
+        response = self.client.get(self.url, {'limit': 2, 'offset': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([row['company'] for row in response.data['results']], ['Beta', 'Delta'])
+
+
+class CompanyExportTest(TestCase):
+    """Test cases for the streaming NDJSON export."""
+    
+    def setUp(self):
+        self.approved = Company.objects.create(domains=['one.com'], company='One', is_approved=True)
+        self.pending = Company.objects.create(domains=['two.com'], company='Two', is_approved=False)
+        self.url = reverse('companies:company-export')
+    
+    def read_lines(self, response):
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+    
+    def test_streams_every_company(self):
+        """Each company is one JSON line, ordered by id."""
+        response = self.client.get(self.url)
+        
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = self.read_lines(response)
+        self.assertEqual([row['company'] for row in rows], ['One', 'Two'])
+        self.assertEqual(rows[0]['domains'], ['one.com'])
+    
+    def test_gzip_when_accepted(self):
+        """Clients sending Accept-Encoding: gzip get a compressed stream."""
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(self.read_lines(response)), 2)
+    
+    def test_filters(self):
+        """is_approved and updated_since narrow the export."""
+        rows = self.read_lines(self.client.get(self.url, {'is_approved': 'false'}))
+        self.assertEqual([row['company'] for row in rows], ['Two'])
+        
+        rows = self.read_lines(self.client.get(self.url, {'updated_since': '2999-01-01'}))
+        self.assertEqual(rows, [])
+        
+        response = self.client.get(self.url, {'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_chunked_fetch(self):
+        """Rows are emitted one chunk per database fetch."""
+        with override_settings(EXPORT_CHUNK_SIZE=1):
+            chunks = list(self.client.get(self.url).streaming_content)
+        self.assertEqual(len(chunks), 2)
+
+
+@override_settings(CHANGE_FEED_LAG=0)
+class ChangeFeedTest(APITestCase):
+    """Test cases for the incremental change feed."""
+    
+    def setUp(self):
+        cache.clear()
+        self.first = Company.objects.create(domains=['first.com'], company='First')
+        self.second = Company.objects.create(domains=['second.com'], company='Second')
+        self.url = reverse('companies:company-changes')
+    
+    def test_initial_sync_returns_everything(self):
+        """Without a token every company is returned in (updated_at, id) order."""
+        response = self.client.get(self.url)
+        
+        self.assertEqual([row['id'] for row in response.data['updated']], [self.first.pk, self.second.pk])
+        self.assertEqual(response.data['deleted'], [])
+        self.assertFalse(response.data['hasMore'])
+    
+    def test_only_changes_after_token(self):
+        """Updates and deletes after the token are reported, nothing else."""
+        token = self.client.get(self.url).data['next']
+        self.assertEqual(self.client.get(self.url, {'since': token}).data['updated'], [])
+        
+        self.first.company = 'First Renamed'
+        self.first.save()
+        second_id = self.second.pk
+        self.second.delete()
+        
+        response = self.client.get(self.url, {'since': token})
+        self.assertEqual([row['company'] for row in response.data['updated']], ['First Renamed'])
+        self.assertEqual([row['id'] for row in response.data['deleted']], [second_id])
+        self.assertEqual(response.data['deleted'][0]['domains'], ['second.com'])
+    
+    def test_paging_with_limit(self):
+        """hasMore is set while a stream has rows left beyond the limit."""
+        response = self.client.get(self.url, {'limit': 1})
+        self.assertTrue(response.data['hasMore'])
+        
+        response = self.client.get(self.url, {'limit': 1, 'since': response.data['next']})
+        self.assertEqual([row['id'] for row in response.data['updated']], [self.second.pk])
+        self.assertFalse(response.data['hasMore'])
+    
+    def test_bulk_delete_leaves_tombstones(self):
+        """Queryset deletes, as used by seed_companies --clear, leave tombstones too."""
+        Company.objects.all().delete()
+        self.assertEqual(CompanyTombstone.objects.count(), 2)
+    
+    def test_seeded_rows_stamped_at_commit(self):
+        """Rows written across a long seeding transaction share the end-of-transaction updated_at."""
+        records = json.dumps([{'company': 'Early Co'}, {'company': 'Late Co'}])
+        with tempfile.TemporaryDirectory() as directory:
+            open(os.path.join(directory, 'companies.json'), 'w').close()
+            with mock.patch('companies.management.commands.seed_companies.open',
+                            mock.mock_open(read_data=records), create=True):
+                call_command('seed_companies', directory=directory, batch_size=1, stdout=io.StringIO())
+        
+        early, late = (Company.objects.get(company=name).updated_at for name in ('Early Co', 'Late Co'))
+        self.assertEqual(early, late)
+        self.assertGreater(early, self.second.updated_at)
+    
+    def test_delete_all_is_bulk(self):
+        """Company.delete_all(), used by seed_companies --clear, writes tombstones in a few statements."""
+        for i in range(20):
+            Company.objects.create(domains=[f'bulk-{i}.com'], company=f'Bulk {i}')
+        CompanyAlternative.objects.create(from_company=self.first, to_company=self.second)
+        before = get_generation()
+        
+        # Read, tombstone insert, request unlink, three deletes, plus the savepoint pair
+        with self.assertNumQueries(8):
+            self.assertEqual(Company.delete_all(), 22)
+        
+        self.assertFalse(Company.objects.exists())
+        self.assertFalse(CompanyDomain.objects.exists())
+        self.assertFalse(CompanyAlternative.objects.exists())
+        self.assertEqual(CompanyTombstone.objects.count(), 22)
+        self.assertEqual(get_generation(), before)
+    
+    def test_admin_action_updates_timestamp(self):
+        """Bulk admin actions bump updated_at so the feed sees them."""
+        from django.contrib.admin.sites import site
+        
+        token = self.client.get(self.url).data['next']
+        site._registry[Company].mark_carbon_neutral(
+            mock.Mock(), Company.objects.filter(pk=self.first.pk)
+        )
+        
+        response = self.client.get(self.url, {'since': token})
+        self.assertEqual([row['id'] for row in response.data['updated']], [self.first.pk])
+    
+    def test_invalid_token(self):
+        """A token that doesn't decode is a 400."""
+        response = self.client.get(self.url, {'since': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AlternativesPrefetchTest(TestCase):
+    """Query budgets for serializing companies with their alternatives."""
+    
+    def setUp(self):
+        self.green = Company.objects.create(domains=['green.com'], company='Green', carbon_neutral=True)
+        self.greener = Company.objects.create(domains=['greener.com'], company='Greener', carbon_neutral=True)
+        for i in range(4):
+            self.add_polluter(i)
+    
+    def add_polluter(self, i):
+        polluter = Company.objects.create(domains=[f'polluter{i}.com'], company=f'Polluter {i}')
+        CompanyAlternative.objects.create(from_company=polluter, to_company=self.green, relevance_score=5)
+        CompanyAlternative.objects.create(from_company=polluter, to_company=self.greener, relevance_score=9)
+    
+    def serialize_all(self):
+        companies = Company.objects.order_by('id').prefetch_related(Company.prefetch_alternatives())
+        return CompanySerializer(companies, many=True).data
+    
+    def test_prefetched_list_is_two_queries(self):
+        """Companies plus one alternatives query, however many rows there are."""
+        with self.assertNumQueries(2):
+            data = self.serialize_all()
+        
+        self.add_polluter(4)
+        with self.assertNumQueries(2):
+            self.serialize_all()
+        
+        polluter = data[2]
+        self.assertEqual([alt['name'] for alt in polluter['carbon_neutral_alternatives']], ['Greener', 'Green'])
+    
+    def test_prefetch_matches_unprefetched_output(self):
+        """Prefetched and per-row serialization produce the same payload."""
+        plain = CompanySerializer(Company.objects.order_by('id'), many=True).data
+        self.assertEqual(self.serialize_all(), plain)
+    
+    def test_snapshot_build_query_budget(self):
+        """Building the domain snapshot doesn't query alternatives per company."""
+        with self.assertNumQueries(3):
+            DomainSnapshot.build(stamp=0, generation=1)
+        
+        self.add_polluter(4)
+        with self.assertNumQueries(3):
+            snapshot = DomainSnapshot.build(stamp=0, generation=1)
+        self.assertEqual(len(snapshot.get('polluter4.com')['carbon_neutral_alternatives']), 2)
+
+
+class RowSerializerTest(TestCase):
+    """The values() fast path must render exactly like the DRF serializers."""
+    
+    def setUp(self):
+        Company.objects.create(domains=['full.com', 'www.full.com'], company='Full', origin='tr',
+                               renewable_share_percent=42.5, parent='Parent', headquarters='Istanbul',
+                               sector='Energy', carbon_neutral=True)
+        Company.objects.create(domains=[], company='Empty', origin='')
+        Company.objects.create(domains=['plain.com'], company='Plain', origin=None, renewable_share_percent=100)
+    
+    def assertSameJSON(self, model_serializer, row_serializer):
+        queryset = Company.objects.order_by('id')
+        expected = JSONRenderer().render(model_serializer(queryset, many=True).data)
+        actual = JSONRenderer().render(row_serializer(row_serializer.values(queryset), many=True).data)
+        self.assertEqual(actual, expected)
+    
+    def test_list_output_identical(self):
+        """Same bytes as CompanyListSerializer, including origin code normalization."""
+        self.assertSameJSON(CompanyListSerializer, CompanyListRowSerializer)
+    
+    def test_search_output_identical(self):
+        """Same bytes as CompanySearchSerializer."""
+        self.assertSameJSON(CompanySearchSerializer, CompanySearchRowSerializer)
+    
+    def test_sparse_output_is_full_output_subset(self):
+        """A field set renders the same values, in serializer order, from just its columns."""
+        queryset = Company.objects.order_by('id')
+        fields = ['domain', 'origin']
+        full = CompanyListRowSerializer(CompanyListRowSerializer.values(queryset), many=True).data
+        sparse = CompanyListRowSerializer(CompanyListRowSerializer.values(queryset, fields), many=True, fields=fields).data
+        self.assertEqual(sparse, [{name: row[name] for name in fields} for row in full])
+        self.assertEqual(CompanyListRowSerializer.available_fields(), tuple(CompanyListSerializer.Meta.fields))
+
+    def test_list_endpoint_single_query_page(self):
+        """A list page is the count plus one narrow query, with no per-row work in the ORM."""
+        cache.clear()
+        get_generation()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('companies:company-list'))
+        self.assertEqual([row['company'] for row in response.json()['results']], ['Empty', 'Full', 'Plain'])
+
+
+@override_settings(CHANGE_FEED_LAG=0)
+class FastJSONRendererTest(APITestCase):
+    """Golden tests: FastJSONRenderer output must match DRF's JSONRenderer byte for byte."""
+    
+    def setUp(self):
+        cache.clear()
+        domain_snapshot.reset()
+        domain_filter.reset()
+        self.addCleanup(miss_buffer.flush)
+        green = Company.objects.create(
+            domains=['yeşil.com.tr', 'green.com'], company='Yeşil Enerji\u2028A.Ş.', carbon_neutral=True,
+            renewable_share_percent=0.00005, origin='tr', description={'tr': 'Çevre "dostu"\u2029\x01', 'en': 'Eco'},
+        )
+        grey = Company.objects.create(
+            domains=['grey.com'], company='Grey 😀 Corp', renewable_share_percent=42.5, sector='Oil & Gas',
+        )
+        CompanyAlternative.objects.create(from_company=grey, to_company=green, relevance_score=7, description='Daha iyi\u2028seçim')
+        DataVersion.objects.get_or_create(version='1.0.0')
+    
+    def fetch_all(self):
+        """Response bodies of every JSON endpoint, then the NDJSON export."""
+        bodies = []
+        get = [
+            (reverse('companies:company-list'), {}),
+            (reverse('companies:company-list'), {'pagination': 'cursor', 'count': 'true'}),
+            (reverse('companies:company-search'), {'company': 'grey'}),
+            (reverse('companies:company-search'), {'q': 'enerji'}),
+            (reverse('companies:company-search'), {'company': 'yesil enrji', 'fuzzy': 'true'}),
+            (reverse('companies:company-suggest'), {'prefix': 'ye'}),
+            (reverse('companies:company-by-domain', kwargs={'domain': 'grey.com'}), {}),
+            (reverse('companies:company-by-domain', kwargs={'domain': 'green.com'}), {}),
+            (reverse('companies:company-by-domain', kwargs={'domain': 'green.com'}), {'lang': 'tr'}),
+            (reverse('companies:company-changes'), {}),
+            (reverse('companies:data-version'), {}),
+        ]
+        for url, params in get:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            bodies.append(response.content)
+        bodies.append(self.client.post(
+            reverse('companies:company-domain-lookup'), {'domains': ['grey.com', 'green.com', 'none.org']}, format='json'
+        ).content)
+        bodies.append(b''.join(self.client.get(reverse('companies:company-export')).streaming_content))
+        return bodies
+    
+    def fetch_all_with_stock_renderer(self):
+        """
+        fetch_all() with JSONRenderer as the default renderer (and in place of FastJSONRenderer
+        in the suggest view) and json.dumps for NDJSON lines. API views read
+        DEFAULT_RENDERER_CLASSES when they are defined, so get_renderers() is pointed back at
+        the setting. The stock renderer can't embed pre-encoded documents, so those are decoded for it.
+        """
+        rest_framework = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+        }
+        
+        def ndjson_line(data):
+            return json.dumps(data, cls=DRFJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        
+        cache.clear()
+        domain_snapshot.reset()
+        suggest_index.reset()
+        with override_settings(REST_FRAMEWORK=rest_framework, DOMAIN_SNAPSHOT_ENABLED=False), \
+                mock.patch.object(APIView, 'get_renderers', lambda view: [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]), \
+                mock.patch('companies.views.JSONFragment', json.loads), \
+                mock.patch.object(FastJSONRenderer, 'render', JSONRenderer.render), \
+                mock.patch('companies.export.dumps', ndjson_line):
+            return self.fetch_all()
+    
+    def test_bodies_match_drf_renderer(self):
+        """Every endpoint renders exactly as JSONRenderer (and json.dumps for NDJSON) would, with either backend."""
+        expected = self.fetch_all_with_stock_renderer()
+        self.assertIn('Yeşil Enerji\\u2028A.Ş.'.encode('utf-8'), expected[0])
+        
+        for backend in ('orjson', 'python'):
+            for snapshot_enabled in (True, False):
+                cache.clear()
+                domain_snapshot.reset()
+                suggest_index.reset()
+                with override_settings(JSON_BACKEND=backend, DOMAIN_SNAPSHOT_ENABLED=snapshot_enabled):
+                    bodies = self.fetch_all()
+                for body, expected_body in zip(bodies, expected, strict=True):
+                    self.assertEqual(body, expected_body, (backend, snapshot_enabled))
+    
+    def test_line_separators_escaped(self):
+        """U+2028/U+2029 are escaped, including inside embedded fragments."""
+        data = {'name': 'a\u2028b', 'nested': JSONFragment.from_data({'text': 'c\u2029d'})}
+        rendered = FastJSONRenderer().render(data)
+        
+        self.assertEqual(rendered, b'{"name":"a\\u2028b","nested":{"text":"c\\u2029d"}}')
+        self.assertEqual(rendered, JSONRenderer().render({'name': 'a\u2028b', 'nested': {'text': 'c\u2029d'}}))
+    
+    def test_fragments_embedded_verbatim(self):
+        """Fragments are copied as is, at the top level or nested."""
+        fragment = JSONFragment(b'{"pre":"encoded"}')
+        self.assertEqual(dumps(fragment), b'{"pre":"encoded"}')
+        self.assertEqual(dumps([fragment, {'x': fragment}]), b'[{"pre":"encoded"},{"x":{"pre":"encoded"}}]')
+    
+    def test_exponent_floats_match_stdlib(self):
+        """Floats json would write in exponent form are formatted like json."""
+        for backend in ('orjson', 'python'):
+            with override_settings(JSON_BACKEND=backend):
+                self.assertEqual(dumps([1e16, 1e-07, 5e-05, 0.5]), b'[1e+16,1e-07,5e-05,0.5]')
+    
+    def test_indent_uses_stock_renderer(self):
+        """Indented output falls back to JSONRenderer."""
+        data = {'a': [1, 2], 'b': JSONFragment(b'{"c":3}')}
+        rendered = FastJSONRenderer().render(data, 'application/json; indent=2')
+        self.assertEqual(rendered, JSONRenderer().render({'a': [1, 2], 'b': {'c': 3}}, 'application/json; indent=2'))
+
+
+class CompanyDocumentTest(APITestCase):
+    """Test cases for the stored per-company JSON document."""
+    
+    def setUp(self):
+        cache.clear()
+        domain_snapshot.reset()
+        domain_filter.reset()
+        self.green = Company.objects.create(domains=['doc-green.com'], company='Doc Green', carbon_neutral=True)
+        self.grey = Company.objects.create(domains=['doc-grey.com'], company='Doc Grey')
+    
+    def document(self, company):
+        company.refresh_from_db()
+        return json.loads(company.document)
+    
+    def test_document_matches_serializer(self):
+        """The stored document is exactly the serialized company."""
+        self.grey.refresh_from_db()
+        self.assertEqual(self.grey.document.encode('utf-8'), dumps(CompanySerializer(self.grey).data))
+    
+    def test_admin_actions_refresh_documents(self):
+        """Bulk admin actions re-render the edited companies and those listing them as alternatives."""
+        from django.contrib.admin.sites import site
+        
+        CompanyAlternative.objects.create(from_company=self.grey, to_company=self.green)
+        admin = site._registry[Company]
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'doc-grey.com'})
+        
+        admin.mark_carbon_neutral(mock.Mock(), Company.objects.filter(pk=self.grey.pk))
+        self.assertTrue(self.document(self.grey)['carbon_neutral'])
+        with override_settings(DOMAIN_SNAPSHOT_ENABLED=False):
+            self.assertTrue(self.client.get(url).json()['carbon_neutral'])
+        
+        with mock.patch.object(Company, 'refresh_documents') as refresh:
+            admin.clear_renewable_data(mock.Mock(), Company.objects.filter(pk=self.green.pk))
+        self.assertEqual(sorted(refresh.call_args[0][0]), [self.green.pk, self.grey.pk])
+    
+    def test_alternative_edits_refresh_document(self):
+        """Adding, renaming and removing alternatives re-renders the referencing company."""
+        alternative = CompanyAlternative.objects.create(from_company=self.grey, to_company=self.green)
+        self.assertEqual(self.document(self.grey)['carbon_neutral_alternatives'][0]['name'], 'Doc Green')
+        
+        self.green.company = 'Doc Greener'
+        self.green.save()
+        self.assertEqual(self.document(self.grey)['carbon_neutral_alternatives'][0]['name'], 'Doc Greener')
+        
+        alternative.delete()
+        self.assertEqual(self.document(self.grey)['carbon_neutral_alternatives'], [])
+    
+    @override_settings(DOMAIN_SNAPSHOT_ENABLED=False, DOMAIN_FILTER_ENABLED=False)
+    def test_detail_is_one_query(self):
+        """Without the snapshot, the domain endpoint reads one column in one query."""
+        get_generation()
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'shop.doc-grey.com'})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.content, JSONRenderer().render(CompanySerializer(self.grey).data))
+    
+    @override_settings(DOMAIN_SNAPSHOT_ENABLED=False, DOMAIN_FILTER_ENABLED=False)
+    def test_missing_document_falls_back_to_serializer(self):
+        """Rows without a document yet (e.g. after a raw import) are still served."""
+        Company.objects.filter(pk=self.grey.pk).update(document='')
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'doc-grey.com'})
+        self.assertEqual(self.client.get(url).json()['company'], 'Doc Grey')
+    
+    def test_rebuild_command(self):
+        """rebuild_company_documents renders every document."""
+        Company.objects.update(document='')
+        call_command('rebuild_company_documents', stdout=io.StringIO())
+        self.assertEqual(self.document(self.green)['company'], 'Doc Green')
+        self.assertFalse(Company.objects.filter(document='').exists())
+
+
+class SparseFieldsetTest(APITestCase):
+    """Test cases for ?fields= sparse fieldsets."""
+    
+    def setUp(self):
+        cache.clear()
+        self.green = Company.objects.create(domains=['sparse-green.com'], company='Sparse Green',
+                                            carbon_neutral=True, description='Long description')
+        self.grey = Company.objects.create(domains=['sparse-grey.com'], company='Sparse Grey',
+                                           renewable_share_percent=12.5, description='Long description')
+        CompanyAlternative.objects.create(from_company=self.grey, to_company=self.green)
+    
+    def test_list_trims_output_and_columns(self):
+        """Only the requested fields are returned and only their columns are selected."""
+        get_generation()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('companies:company-list'), {'fields': 'company,carbon_neutral'})
+        self.assertEqual(response.json()['results'], [
+            {'company': 'Sparse Green', 'carbon_neutral': True},
+            {'company': 'Sparse Grey', 'carbon_neutral': False},
+        ])
+        page_query = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"domains"', page_query)
+        self.assertNotIn('"renewable_share_percent"', page_query)
+    
+    def test_search_trims_output(self):
+        """Search honours ?fields= as well."""
+        response = self.client.get(reverse('companies:company-search'), {'company': 'grey', 'fields': 'domain'})
+        self.assertEqual(response.json()['results'], [{'domain': 'sparse-grey.com'}])
+    
+    @override_settings(DOMAIN_SNAPSHOT_ENABLED=False, DOMAIN_FILTER_ENABLED=False)
+    def test_detail_skips_alternatives_unless_requested(self):
+        """Alternatives are only queried when carbon_neutral_alternatives is requested."""
+        get_generation()
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'sparse-grey.com'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'renewable_share_percent,carbon_neutral'})
+        self.assertEqual(response.json(), {'carbon_neutral': False, 'renewable_share_percent': 12.5})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries.captured_queries[0]['sql'])
+        
+        response = self.client.get(url, {'fields': 'carbon_neutral_alternatives'})
+        self.assertEqual(response.json()['carbon_neutral_alternatives'][0]['name'], 'Sparse Green')
+    
+    def test_detail_from_snapshot(self):
+        """Snapshot hits are trimmed to the requested fields too."""
+        domain_snapshot.reset()
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'sparse-green.com'})
+        response = self.client.get(url, {'fields': 'company'})
+        self.assertEqual(response.json(), {'company': 'Sparse Green'})
+    
+    def test_unknown_field_is_rejected(self):
+        """Unknown field names are a 400."""
+        response = self.client.get(reverse('companies:company-list'), {'fields': 'company,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', response.json()['error'])
+    
+    def test_field_order_shares_cache_entry(self):
+        """fields=a,b and fields=b,a are the same cached response."""
+        url = reverse('companies:company-list')
+        first = self.client.get(url, {'fields': 'company,origin'})
+        second = self.client.get(url, {'fields': 'origin,company'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+
+
+class DescriptionLanguageTest(APITestCase):
+    """Test cases for ?lang= / Accept-Language description selection."""
+    
+    def setUp(self):
+        cache.clear()
+        domain_snapshot.reset()
+        self.description = {'tr': 'Türkçe metin', 'en': 'English text', 'de': 'Deutscher Text'}
+        Company.objects.create(domains=['lang.com'], company='Lang', description=self.description)
+        Company.objects.create(domains=['lang-de.com'], company='Lang DE', description={'de': 'Nur Deutsch'})
+        Company.objects.create(domains=['lang-tr.com'], company='Lang TR', description={'tr': 'Sadece Türkçe', 'de': 'X'})
+        self.url = reverse('companies:company-by-domain', kwargs={'domain': 'lang.com'})
+    
+    def test_accept_language_parsing(self):
+        """The highest-quality supported language wins; unsupported ones fall back to en."""
+        self.assertEqual(language_from_header('de-DE,de;q=0.9,en;q=0.8'), 'de')
+        self.assertEqual(language_from_header('fr;q=1, tr;q=0.7, en;q=0.5'), 'tr')
+        self.assertEqual(language_from_header('en;q=0, de;q=0.1'), 'de')
+        self.assertEqual(language_from_header('fr, *'), 'en')
+    
+    def test_fallback_chain(self):
+        """Missing languages fall back to en, then tr."""
+        self.assertEqual(select_description(self.description, 'de'), {'de': 'Deutscher Text'})
+        self.assertEqual(select_description({'tr': 'a', 'en': 'b'}, 'de'), {'en': 'b'})
+        self.assertEqual(select_description({'tr': 'a'}, 'de'), {'tr': 'a'})
+        self.assertEqual(select_description({'de': 'a'}, 'en'), {})
+        self.assertEqual(select_description(None, 'en'), None)
+    
+    def test_every_serving_path(self):
+        """Snapshot, stored document and serializer paths agree."""
+        for snapshot_enabled in (True, False):
+            for document in (True, False):
+                if not document:
+                    Company.objects.update(document='')
+                cache.clear()
+                with override_settings(DOMAIN_SNAPSHOT_ENABLED=snapshot_enabled, DOMAIN_FILTER_ENABLED=False):
+                    with self.subTest(snapshot=snapshot_enabled, document=document):
+                        self.assertEqual(self.client.get(self.url, {'lang': 'tr'}).json()['description'],
+                                         {'tr': 'Türkçe metin'})
+                        self.assertEqual(self.client.get(self.url, {'lang': 'all'}).json()['description'],
+                                         self.description)
+                        self.assertEqual(self.client.get(self.url).json()['description'], self.description)
+    
+    def test_lang_param_overrides_header(self):
+        """?lang= takes precedence over Accept-Language."""
+        response = self.client.get(self.url, {'lang': 'en'}, HTTP_ACCEPT_LANGUAGE='de')
+        self.assertEqual(response.json()['description'], {'en': 'English text'})
+        url = reverse('companies:company-by-domain', kwargs={'domain': 'lang-tr.com'})
+        response = self.client.get(url, HTTP_ACCEPT_LANGUAGE='fr-FR')
+        self.assertEqual(response.json()['description'], {'tr': 'Sadece Türkçe'})
+    
+    def test_cache_keyed_per_language(self):
+        """Each negotiated language is cached separately and responses vary on Accept-Language."""
+        german = self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='de')
+        turkish = self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='tr-TR,tr;q=0.9')
+        self.assertEqual(turkish['X-Cache'], 'MISS')
+        self.assertEqual(turkish.json()['description'], {'tr': 'Türkçe metin'})
+        
+        again = self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='de-AT')
+        self.assertEqual(again['X-Cache'], 'HIT')
+        self.assertEqual(again.content, german.content)
+        self.assertIn('Accept-Language', again['Vary'])
+        self.assertIn('Accept-Language', german['Vary'])
+
+
+@override_settings(SEARCH_BACKEND='memory')
+class FullTextSearchTest(APITestCase):
+    """Test cases for ?q= full-text search (in-memory index)."""
+    
+    def setUp(self):
+        cache.clear()
+        full_text_index.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=['arcelik.com'], company='Arçelik A.Ş.', description={
+                'tr': 'Beyaz eşya ve dayanıklı tüketim ürünleri üreticisi',
+                'en': 'Manufacturer of household appliances',
+            })
+            Company.objects.create(domains=['solar.de'], company='Sonnenstrom GmbH', description={
+                'de': 'Erneuerbare Energien aus Solaranlagen',
+                'en': 'Renewable energy from solar parks',
+            })
+            Company.objects.create(domains=['appliance.com'], company='Appliance World', description='Retailer')
+        self.url = reverse('companies:company-search')
+    
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['company'] for row in response.json()['results']]
+    
+    def test_matches_every_language(self):
+        """Turkish, English and German description words all match."""
+        self.assertEqual(self.search(q='dayanıklı'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.search(q='renewable energy'), ['Sonnenstrom GmbH'])
+        self.assertEqual(self.search(q='Erneuerbare'), ['Sonnenstrom GmbH'])
+    
+    def test_folding_and_prefixes(self):
+        """Accents and dotless i are folded; longer words match by prefix."""
+        self.assertEqual(self.search(q='arcelik'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.search(q='SOLARANLAGE'), ['Sonnenstrom GmbH'])
+        self.assertEqual(self.search(q='tuketim urun'), ['Arçelik A.Ş.'])
+    
+    def test_name_matches_rank_first(self):
+        """A name match outranks a description match."""
+        self.assertEqual(self.search(q='appliance'), ['Appliance World', 'Arçelik A.Ş.'])
+    
+    def test_combines_with_existing_params(self):
+        """q narrows the company/domain search."""
+        self.assertEqual(self.search(q='appliance', company='Arç'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.search(q='nothing-like-this'), [])
+    
+    def test_index_follows_dataset_changes(self):
+        """New companies are searchable once the generation moves."""
+        self.assertEqual(self.search(q='windenergie'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=['wind.com'], company='Windkraft', description={'de': 'Windenergie'})
+        # Rebuilt on the first search of the new generation, not after the check interval
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600):
+            self.assertEqual(self.search(q='windenergie'), ['Windkraft'])
+
+
+@override_settings(SEARCH_BACKEND='memory')
+class FuzzySearchTest(APITestCase):
+    """Test cases for ?fuzzy=true trigram name search (in-memory index)."""
+    
+    def setUp(self):
+        cache.clear()
+        trigram_index.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ['Arçelik A.Ş.', 'Unilever', 'Mercedes-Benz Türk', 'Mercedes Yapı', 'Beko', 'Vestel']:
+                Company.objects.create(domains=[], company=name)
+        self.url = reverse('companies:company-search')
+    
+    def search(self, name, **params):
+        response = self.client.get(self.url, {'company': name, 'fuzzy': 'true', **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['company'] for row in response.json()['results']]
+    
+    def test_trigrams_match_pg_trgm(self):
+        """Words are padded like pg_trgm and folded before splitting."""
+        self.assertEqual(trigrams('Ab-c'), {'  a', ' ab', 'ab ', '  c', ' c '})
+        self.assertEqual(trigrams('İş'), trigrams('is'))
+    
+    def test_typos_and_accents(self):
+        """Misspelt and unaccented names find the company."""
+        self.assertEqual(self.search('Arcelik'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.search('Unilevr'), ['Unilever'])
+        self.assertEqual(self.search('Mercedes Benz')[0], 'Mercedes-Benz Türk')
+    
+    def test_ranked_and_limited(self):
+        """Results are ordered by similarity, capped at SEARCH_FUZZY_LIMIT and above the threshold."""
+        self.assertEqual(self.search('Mercedes'), ['Mercedes Yapı', 'Mercedes-Benz Türk'])
+        with override_settings(SEARCH_FUZZY_LIMIT=1):
+            cache.clear()
+            self.assertEqual(self.search('Mercedes'), ['Mercedes Yapı'])
+        self.assertEqual(self.search('Siemens'), [])
+    
+    def test_index_follows_dataset_changes(self):
+        """A company added after the index was built is found by the next search."""
+        self.assertEqual(self.search('Siemens'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.create(domains=[], company='Siemens')
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600):
+            self.assertEqual(self.search('Siemens'), ['Siemens'])
+    
+    def test_index_search_matches_brute_force(self):
+        """The index returns exactly what scoring every name would."""
+        trigram_index.refresh(force=True)
+        index = trigram_index.get()
+        names = dict(Company.objects.values_list('id', 'company'))
+        for query in ['Mercedes', 'arc', 'Unilever Türk', 'Be', 'Vestel Beko']:
+            grams = trigrams(query)
+            expected = []
+            for company_id, name in names.items():
+                other = trigrams(name)
+                similarity = len(grams & other) / len(grams | other)
+                if similarity >= 0.3:
+                    expected.append((company_id, similarity))
+            expected.sort(key=lambda item: (-item[1], names[item[0]], item[0]))
+            with self.subTest(query=query):
+                self.assertEqual(index.search(query, 10, 0.3), expected[:10])
+
+
+class SuggestTest(APITestCase):
+    """Test cases for GET /api/companies/suggest."""
+    
+    def setUp(self):
+        cache.clear()
+        suggest_index.reset()
+        self.arcelik = Company.objects.create(domains=['arcelik.com.tr'], company='Arçelik A.Ş.', is_approved=True)
+        self.arena = Company.objects.create(domains=['arena.com'], company='Arena Bilgisayar')
+        self.arkas = Company.objects.create(domains=['www.arkas.com'], company='Arkas Holding')
+        self.green = Company.objects.create(domains=['green-ar.com'], company='Green Ar Enerji', carbon_neutral=True)
+        # Referenced as an alternative: the most popular
+        CompanyAlternative.objects.create(from_company=self.arena, to_company=self.green)
+        self.url = reverse('companies:company-suggest')
+    
+    def suggest(self, prefix, **params):
+        response = self.client.get(self.url, {'prefix': prefix, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['company'] for row in response.json()['results']]
+    
+    def test_popularity_ordering(self):
+        """Referenced companies first, then approved ones, then shorter names."""
+        self.assertEqual(self.suggest('ar'), ['Green Ar Enerji', 'Arçelik A.Ş.', 'Arkas Holding', 'Arena Bilgisayar'])
+    
+    def test_matches_words_domains_and_folds(self):
+        """Later words, domains (without www.) and unaccented spellings match; each company once."""
+        self.assertEqual(self.suggest('ENERJ'), ['Green Ar Enerji'])
+        self.assertEqual(self.suggest('arkas.c'), ['Arkas Holding'])
+        self.assertEqual(self.suggest('www.arena'), ['Arena Bilgisayar'])
+        self.assertEqual(self.suggest('arcel'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.suggest('arç'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.suggest('zz'), [])
+    
+    def test_payload_and_limit(self):
+        """Results carry name, primary domain and carbon neutrality, capped by limit."""
+        response = self.client.get(self.url, {'prefix': 'ar', 'limit': 1})
+        self.assertEqual(response.json(), {'prefix': 'ar', 'results': [
+            {'company': 'Green Ar Enerji', 'domain': 'green-ar.com', 'carbon_neutral': True},
+        ]})
+        self.assertEqual(self.client.get(self.url, {'prefix': 'ar', 'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'prefix': 'ar', 'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+    
+    def test_no_queries_per_keystroke(self):
+        """Once built, suggestions never touch the database."""
+        self.suggest('a')
+        with override_settings(DOMAIN_SNAPSHOT_CHECK_INTERVAL=3600), self.assertNumQueries(0):
+            for prefix in ['a', 'ar', 'ark', 'arka', 'arkas']:
+                self.suggest(prefix)
+    
+    def test_rebuilt_on_data_change(self):
+        """A new company shows up after the generation moves."""
+        Company.objects.create(domains=['arzum.com'], company='Arzum')
+        suggest_index.refresh()
+        self.assertIn('Arzum', self.suggest('arz'))
+
+
+class DomainSearchTest(APITestCase):
+    """Test cases for ?domain= on the search endpoint."""
+    
+    def setUp(self):
+        cache.clear()
+        Company.objects.create(domains=['google.com.tr'], company='Google Türkiye')
+        Company.objects.create(domains=['mail.google.com'], company='Gmail')
+        Company.objects.create(domains=['google.com', 'www.google.de'], company='Google')
+        Company.objects.create(domains=['example.org'], company='Googly Eyes Ltd')
+        self.url = reverse('companies:company-search')
+    
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['company'] for row in response.json()['results']]
+    
+    def test_reversed_domain_is_maintained(self):
+        """Index rows created by save() and by index_companies() carry the reversed domain."""
+        self.assertEqual(CompanyDomain.objects.get(domain='google.de').reversed_domain, 'ed.elgoog')
+        CompanyDomain.objects.all().delete()
+        CompanyDomain.rebuild_index()
+        self.assertFalse(CompanyDomain.objects.filter(reversed_domain='').exists())
+    
+    def test_exact_then_suffix_then_prefix(self):
+        """Exact matches rank first, then subdomains, then longer domains."""
+        self.assertEqual(self.search(domain='WWW.Google.com'), ['Google', 'Gmail', 'Google Türkiye'])
+        self.assertEqual(self.search(domain='google.de'), ['Google'])
+        self.assertEqual(self.search(domain='nothing.example'), [])
+    
+    def test_partial_domains(self):
+        """Typed fragments match by prefix or suffix, never in the middle."""
+        self.assertEqual(self.search(domain='goog'), ['Google', 'Google Türkiye'])
+        self.assertEqual(self.search(domain='.com.tr'), ['Google Türkiye'])
+    
+    def test_suffix_rank_respects_label_boundaries(self):
+        """A domain that merely ends with the query is not a subdomain and ranks after longer domains."""
+        Company.objects.create(domains=['notgoogle.com'], company='Not Google')
+        self.assertEqual(self.search(domain='google.com'), ['Google', 'Gmail', 'Google Türkiye', 'Not Google'])
+
+    def test_combined_with_name_search_in_one_query(self):
+        """Domain and name matches come back together, name-only matches last."""
+        get_generation()
+        with self.assertNumQueries(2):
+            results = self.search(domain='google.com', company='googly')
+        self.assertEqual(results, ['Google', 'Gmail', 'Google Türkiye', 'Googly Eyes Ltd'])
+
+
+class NameKeyTest(APITestCase):
+    """Test cases for the folded Company.name_key used by name matching."""
+    
+    def setUp(self):
+        cache.clear()
+        Company.objects.create(domains=[], company='Arçelik A.Ş.')
+        Company.objects.create(domains=[], company='IŞIK Elektrik')
+        Company.objects.create(domains=[], company='İstanbul Enerji')
+        self.url = reverse('companies:company-search')
+    
+    def search(self, name):
+        response = self.client.get(self.url, {'company': name})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['company'] for row in response.json()['results']]
+    
+    def test_turkish_folding(self):
+        """Dotted and dotless i, cedillas and spacing fold to the same key."""
+        self.assertEqual(name_key('ARÇELİK  A.Ş. '), 'arcelik a.s.')
+        self.assertEqual(name_key('IŞIK'), name_key('ışık'))
+        self.assertEqual(name_key('İstanbul'), 'istanbul')
+        self.assertEqual(name_key(''), '')
+    
+    def test_save_keeps_key_in_sync(self):
+        """save() fills the key, also when only the name is in update_fields."""
+        company = Company.objects.get(company='Arçelik A.Ş.')
+        self.assertEqual(company.name_key, 'arcelik a.s.')
+        company.company = 'Beko A.Ş.'
+        company.save(update_fields=['company'])
+        company.refresh_from_db()
+        self.assertEqual(company.name_key, 'beko a.s.')
+    
+    def test_name_search_matches_any_casing(self):
+        """?company= matches regardless of Turkish casing and accents."""
+        self.assertEqual(self.search('ARÇELİK'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.search('arcelik a.s'), ['Arçelik A.Ş.'])
+        self.assertEqual(self.search('ışık'), ['IŞIK Elektrik'])
+        self.assertEqual(self.search('istanbul'), ['İstanbul Enerji'])
+    
+    def test_seeding_fills_and_dedups_by_key(self):
+        """Seeded rows get a key and a differently cased name is recognized as existing."""
+        records = json.dumps([{'company': 'ARÇELİK A.Ş.'}, {'company': 'Vestel Elektronik'}])
+        with tempfile.TemporaryDirectory() as directory:
+            open(os.path.join(directory, 'companies.json'), 'w').close()
+            # Serves the records and keeps the skipped companies report out of the data directory
+            seed_open = mock.mock_open(read_data=records)
+            with mock.patch('companies.management.commands.seed_companies.open', seed_open, create=True):
+                call_command('seed_companies', directory=directory, stdout=io.StringIO())
+        self.assertEqual(Company.objects.filter(name_key='arcelik a.s.').count(), 1)
+        self.assertEqual(Company.objects.get(company='Vestel Elektronik').name_key, 'vestel elektronik')
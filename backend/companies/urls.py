@@ -6,11 +6,16 @@ app_name = 'companies'
 urlpatterns = [
     # Company endpoints (matching Node.js backend structure)
     path('companies/', views.CompanyListView.as_view(), name='company-list'),
+    path('companies/changes', views.company_changes_view, name='company-changes'),
+    path('companies/export.ndjson', views.company_export_view, name='company-export'),
     path('companies/search', views.CompanySearchView.as_view(), name='company-search'),
+    path('companies/suggest', views.company_suggest_view, name='company-suggest'),
     path('companies/domain/<str:domain>', views.CompanyByDomainView.as_view(), name='company-by-domain'),
     path('companies/domain/<str:domain>/', views.CompanyByDomainView.as_view(), name='company-by-domain-slash'),
+    path('companies/domains/lookup', views.DomainLookupView.as_view(), name='company-domain-lookup'),
     
     # Data version endpoints  
     path('data/version', views.data_version_view, name='data-version'),
     path('data/refresh', views.refresh_data_version, name='data-refresh'),
+    path('data/domain-filter', views.domain_filter_view, name='data-domain-filter'),
 ]
\ No newline at end of file
@@ -1,99 +1,236 @@
+import datetime
+import json
+
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.core.cache import cache
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_response_headers, patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags
+from django.utils.text import compress_sequence
+from django.views.decorators.http import require_GET
 from django.db.models import Q
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.views import APIView
 
-from .models import Company, DataVersion, CompanyRequest
+from .domains import normalize_domain
+from .languages import ALL_LANGUAGES, localize_payload, request_language
+from .names import name_key
+from .models import Company, DataVersion
+from .bloom import encode_delta
+from .changes import InvalidToken, decode_token, encode_token, read_changes
+from .export import iter_ndjson
+from .cache import bump_generation, cache_response
+from .renderers import FastJSONRenderer, JSONFragment
+from .search import domain_match_filter, domain_match_rank, search_companies, similar_companies
+from .pagination import CompanyKeysetPagination, CompanyPagination
+from .suggest import normalize_prefix, suggest_index
+from .telemetry import record_misses
+from .snapshot import domain_filter, filter_artifact_cache_key, get_domain_filter, get_domain_snapshot
 from .serializers import (
     CompanySerializer, 
-    CompanyListSerializer, 
+    CompanyListRowSerializer,
+    CompanyExportSerializer,
+    CompanyChangeSerializer,
     CompanySearchSerializer,
-    DataVersionSerializer
+    CompanySearchRowSerializer,
+    DataVersionSerializer,
+    columns_for,
+    parse_fields,
 )
 
 
-class CompanyPagination(LimitOffsetPagination):
+class SparseFieldsMixin:
     """
-    Custom pagination to match Node.js backend behavior.
+    ?fields=a,b,c support: the serializer only outputs the requested fields and the
+    query only selects the columns they need. Unknown field names are a 400.
     """
-    default_limit = 50
-    max_limit = 1000
+    fields_query_param = 'fields'
+    
+    def get_requested_fields(self):
+        """Requested field names in serializer order, or None for the full field set."""
+        if not hasattr(self, '_requested_fields'):
+            try:
+                self._requested_fields = parse_fields(
+                    self.request.query_params.get(self.fields_query_param),
+                    self.get_serializer_class().available_fields()
+                )
+            except ValueError as e:
+                raise ValidationError({'error': str(e)})
+        return self._requested_fields
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
 
 
-@method_decorator(cache_page(60 * 60), name='dispatch')  # Cache for 1 hour
-class CompanyListView(generics.ListAPIView):
+@method_decorator(cache_response(), name='dispatch')
+class CompanyListView(SparseFieldsMixin, generics.ListAPIView):
     """
     GET /api/companies
     List all companies with pagination.
     Matches Node.js backend: GET /api/companies?limit=50&offset=0
+    
+    GET /api/companies?pagination=cursor&limit=50[&count=true]
+    Keyset pagination for deep listing; follow the returned `next` link.
+    
+    ?fields=company,carbon_neutral limits the output (and selected columns) to those fields.
     """
     queryset = Company.objects.all()
-    serializer_class = CompanyListSerializer
+    # values() fast path with the same output as CompanyListSerializer
+    serializer_class = CompanyListRowSerializer
     pagination_class = CompanyPagination
     
     def get_queryset(self):
-        """Optimize query with select_related if needed."""
-        return Company.objects.all().order_by('company')
+        """Fetch only the needed columns, as plain rows."""
+        return CompanyListRowSerializer.values(
+            Company.objects.all().order_by('company'), self.get_requested_fields()
+        )
+    
+    @property
+    def paginator(self):
+        """Use keyset pagination when the client asks for it, limit/offset otherwise."""
+        if not hasattr(self, '_paginator'):
+            if CompanyKeysetPagination.is_requested(self.request):
+                self._paginator = CompanyKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
 
-@method_decorator(cache_page(60 * 15), name='dispatch')  # Cache for 15 minutes 
-class CompanySearchView(generics.ListAPIView):
+@method_decorator(cache_response(), name='dispatch')
+class CompanySearchView(SparseFieldsMixin, generics.ListAPIView):
     """
     GET /api/companies/search
     Search companies by domain or company name.
     Matches Node.js backend: GET /api/companies/search?domain=google.com&company=Google
+    ?q= adds full-text search over names and the tr/en/de descriptions, best match first.
+    ?fuzzy=true matches ?company= by trigram similarity instead (typo tolerant), returning
+    the SEARCH_FUZZY_LIMIT most similar names; ?domain= is not used in that mode.
+    Supports ?fields= like the list endpoint.
     """
-    serializer_class = CompanySearchSerializer
+    # values() fast path with the same output as CompanySearchSerializer
+    serializer_class = CompanySearchRowSerializer
     pagination_class = CompanyPagination
     
     def get_queryset(self):
         """
         Filter companies based on query parameters.
-        Supports both 'domain' and 'company' search parameters.
+        Supports 'domain' and 'company' search parameters (either may match, in one query)
+        and full-text 'q', which every result must match.
+        Domain matches rank exact first, then subdomains (suffix), then longer domains
+        (prefix), then domains merely ending with it (notgoogle.com for google.com), then
+        companies matched by name only.
         """
-        queryset = Company.objects.none()
+        fields = self.get_requested_fields()
+        queryset = CompanySearchRowSerializer.values(Company.objects.none(), fields)
         
-        domain = self.request.query_params.get('domain', '').strip()
+        domain = normalize_domain(self.request.query_params.get('domain', ''))
         company_name = self.request.query_params.get('company', '').strip()
+        text = self.request.query_params.get('q', '').strip()
+        fuzzy = self.request.query_params.get('fuzzy', '').lower() == 'true' and bool(company_name)
         
-        if not domain and not company_name:
+        if not domain and not company_name and not text:
             return queryset
-            
-        # Build search query
-        search_q = Q()
-        
-        if domain:
-            # Flexible domain matching (case insensitive, with/without www)
-            normalized_domain = domain.lower()
-            if normalized_domain.startswith('www.'):
-                normalized_domain = normalized_domain[4:]
-                
-            search_q |= Q(domain__icontains=normalized_domain)
-            search_q |= Q(domain__icontains=f"www.{normalized_domain}")
-            
-        if company_name:
-            # Case insensitive company name search
-            search_q |= Q(company__icontains=company_name)
-            
-        return Company.objects.filter(search_q).order_by('company')
+        
+        if fuzzy:
+            companies = Company.objects.all()
+        else:
+            # Build search query
+            search_q = Q()
+            if domain:
+                # Indexed exact/suffix/prefix lookup on the normalized domain index
+                search_q |= domain_match_filter(domain)
+            if company_name:
+                # Substring of the folded name key (pg_trgm GIN index on PostgreSQL)
+                search_q |= Q(name_key__contains=name_key(company_name))
+            companies = Company.objects.filter(search_q)
+            if domain:
+                companies = companies.annotate(match_rank=domain_match_rank(domain))
+        
+        if text:
+            companies = search_companies(companies, text)
+        if fuzzy:
+            companies = similar_companies(companies, company_name)
+        elif not text:
+            companies = companies.order_by('match_rank', 'company', 'id') if domain else companies.order_by('company')
+        
+        queryset = CompanySearchRowSerializer.values(companies, fields)
+        if fuzzy:
+            queryset = queryset[:settings.SEARCH_FUZZY_LIMIT]
+        return queryset
 
 
-@method_decorator(cache_page(60 * 60), name='dispatch')  # Cache for 1 hour
-class CompanyByDomainView(generics.RetrieveAPIView):
+@method_decorator(cache_response(variant=request_language, vary=('Accept-Language',)), name='dispatch')
+class CompanyByDomainView(SparseFieldsMixin, generics.RetrieveAPIView):
     """
     GET /api/companies/domain/:domain
     Get specific company by domain with flexible matching.
     Matches Node.js backend: GET /api/companies/domain/google.com
+    With ?fields= only those fields are returned; alternatives aren't queried unless requested.
+    With ?lang=en|tr|de (or Accept-Language) the description holds only that language,
+    falling back to en, then tr; ?lang=all returns every translation.
     """
     serializer_class = CompanySerializer
     lookup_field = 'domain'
     
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve hits from the in-process domain snapshot when available.
+        Definite misses are rejected by the Bloom filter without querying companies.
+        Both are only used while built from the current dataset generation (see
+        get_domain_snapshot / get_domain_filter); anything else is looked up in the
+        database (as the stored company document), so recent edits and additions are
+        never served stale or rejected.
+        """
+        domain = self.kwargs.get('domain', '').strip()
+        normalized_domain = normalize_domain(domain)
+        fields = self.get_requested_fields()
+        language = request_language(request)
+        
+        snapshot = get_domain_snapshot()
+        if snapshot is not None:
+            if fields is None and language == ALL_LANGUAGES:
+                fragment = snapshot.get_fragment(normalized_domain)
+                if fragment is not None:
+                    return Response(fragment)
+            else:
+                payload = snapshot.get(normalized_domain)
+                if payload is not None:
+                    if fields is not None:
+                        payload = {name: payload[name] for name in fields}
+                    return Response(localize_payload(payload, language))
+        
+        domain_filter = get_domain_filter()
+        if normalized_domain and domain_filter is not None and not domain_filter.might_exist(normalized_domain):
+            record_misses([domain])
+            raise Http404(f"Company not found for domain: {domain}")
+        
+        if fields is None:
+            # The stored document is the serialized response; only render it here if it's missing
+            document = Company.find_document_by_domain(domain)
+            if document and language != ALL_LANGUAGES:
+                return Response(localize_payload(json.loads(document), language))
+            if document:
+                return Response(JSONFragment(document))
+            if document is None and domain:
+                record_misses([domain])
+                raise Http404(f"Company not found for domain: {domain}")
+        
+        return super().retrieve(request, *args, **kwargs)
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['language'] = request_language(self.request)
+        return context
+    
     def get_object(self):
         """
         Get company by domain with flexible matching logic.
@@ -105,18 +242,72 @@ class CompanyByDomainView(generics.RetrieveAPIView):
         if not domain:
             raise Http404("Domain parameter is required")
 
-        company = Company.find_by_domain(domain)
+        fields = self.get_requested_fields()
+        only = columns_for(fields) if fields is not None else None
+        company = Company.find_by_domain(domain, only=only)
 
         if not company:
             # Record this request for tracking purposes
-            CompanyRequest.record_request(domain)
+            record_misses([domain])
             raise Http404(f"Company not found for domain: {domain}")
 
         return company
 
 
+class DomainLookupView(APIView):
+    """
+    POST /api/companies/domains/lookup
+    Resolve a batch of domains in one round trip.
+    Body: {"domains": ["google.com", "mail.google.com", ...]}
+    Returns {"results": {domain: company summary or null}}.
+    """
+    max_domains = 500
+    summary_fields = CompanySearchSerializer.Meta.fields
+    
+    def post(self, request):
+        domains = request.data.get('domains') if isinstance(request.data, dict) else request.data
+        
+        if not isinstance(domains, list) or not all(isinstance(domain, str) for domain in domains):
+            return Response(
+                {'error': 'Expected a JSON body like {"domains": ["example.com", ...]}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(domains) > self.max_domains:
+            return Response(
+                {'error': f'At most {self.max_domains} domains can be looked up at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        normalized = {domain: normalize_domain(domain) for domain in domains}
+        summaries = {}
+        
+        # In-memory hits first; only the remainder goes to the database
+        snapshot = get_domain_snapshot()
+        if snapshot is not None:
+            for normalized_domain in set(normalized.values()):
+                payload = snapshot.get(normalized_domain)
+                if payload is not None:
+                    summaries[normalized_domain] = {field: payload[field] for field in self.summary_fields}
+        
+        remaining = {d for d in normalized.values() if d and d not in summaries}
+        domain_filter = get_domain_filter()
+        if domain_filter is not None:
+            remaining = {d for d in remaining if domain_filter.might_exist(d)}
+        if remaining:
+            for normalized_domain, company in Company.find_by_domains(remaining).items():
+                summaries[normalized_domain] = CompanySearchSerializer(company).data
+        
+        results = {domain: summaries.get(normalized_domain) for domain, normalized_domain in normalized.items()}
+        
+        misses = {d for d in normalized.values() if d and d not in summaries}
+        if misses:
+            record_misses(misses)
+        
+        return Response({'results': results})
+
+
 @api_view(['GET'])
-@cache_page(60 * 60 * 24)  # Cache for 24 hours
+@cache_response()
 def data_version_view(request):
     """
     GET /api/data/version
@@ -165,7 +356,7 @@ def data_version_view(request):
 def refresh_data_version(request):
     """
     POST /api/data/refresh
-    Refresh data version statistics (admin operation).
+    Refresh data version statistics (admin operation) and invalidate cached responses.
     """
     try:
         version = DataVersion.get_current_version()
@@ -173,6 +364,8 @@ def refresh_data_version(request):
             version = DataVersion.objects.create(version='1.0.0')
             
         version.update_counts()
+        bump_generation()
+        version.refresh_from_db()
         
         serializer = DataVersionSerializer(version)
         return Response({
@@ -184,4 +377,162 @@ def refresh_data_version(request):
         return Response(
             {'error': f'Failed to refresh data version: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+@require_GET
+def domain_filter_view(request):
+    """
+    GET /api/data/domain-filter
+    Binary Bloom filter of all company domains for client-side pre-checks
+    (format documented in companies/bloom.py).
+    Supports If-None-Match (304 when unchanged) and ?base=<etag> for a delta
+    against a previously downloaded filter; X-Filter-Format says which one was sent.
+    X-Data-Generation is the dataset generation the filter was built from.
+    """
+    filter_snapshot = domain_filter.get()
+    if filter_snapshot is None:
+        return JsonResponse({'error': 'Domain filter is not available'}, status=503)
+    
+    etag = filter_snapshot.etag
+    quoted_etag = f'"{etag}"'
+    headers = {
+        'ETag': quoted_etag,
+        'Cache-Control': 'public, max-age=300',
+        'X-Data-Version': filter_snapshot.data_version or '',
+        'X-Data-Generation': str(filter_snapshot.stamp),
+    }
+    
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or quoted_etag in parse_etags(if_none_match)):
+        return HttpResponse(status=304, headers=headers)
+    
+    body = filter_snapshot.artifact
+    body_format = 'full'
+    base = request.GET.get('base', '').strip().strip('"')
+    if base and base != etag:
+        base_artifact = cache.get(filter_artifact_cache_key(base))
+        if base_artifact is not None:
+            delta = encode_delta(base_artifact, body)
+            if delta is not None and len(delta) < len(body):
+                body = delta
+                body_format = 'delta'
+                headers['X-Filter-Base'] = base
+    
+    headers['X-Filter-Format'] = body_format
+    return HttpResponse(body, content_type='application/octet-stream', headers=headers)
+
+
+@require_GET
+def company_suggest_view(request):
+    """
+    GET /api/companies/suggest?prefix=ar&limit=10
+    Search-as-you-type suggestions matching the start of a company name, of any word
+    in it, or of a domain, most popular first. Served from the per-worker suggestion
+    index without touching the database.
+    Returns {"prefix": ..., "results": [{"company", "domain", "carbon_neutral"}, ...]}.
+    """
+    prefix = request.GET.get('prefix')
+    if prefix is None:
+        return JsonResponse({'error': 'prefix parameter is required'}, status=400)
+    
+    limit = request.GET.get('limit')
+    if limit is None:
+        limit = settings.SUGGEST_DEFAULT_LIMIT
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return JsonResponse({'error': 'limit must be an integer'}, status=400)
+        if not 1 <= limit <= settings.SUGGEST_MAX_LIMIT:
+            return JsonResponse({'error': f'limit must be between 1 and {settings.SUGGEST_MAX_LIMIT}'}, status=400)
+    
+    index = suggest_index.get()
+    if index is None:
+        return JsonResponse({'error': 'Suggestions are not available'}, status=503)
+    
+    body = FastJSONRenderer().render({'prefix': prefix, 'results': index.suggest(normalize_prefix(prefix), limit)})
+    response = HttpResponse(body, content_type='application/json')
+    patch_response_headers(response, settings.API_CACHE_CLIENT_MAX_AGE)
+    return response
+
+
+def _parse_since(value):
+    """Parse an ISO 8601 date or datetime into an aware datetime, or None if invalid."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+@require_GET
+def company_export_view(request):
+    """
+    GET /api/companies/export.ndjson
+    Stream every company as newline-delimited JSON, one object per line, ordered by id.
+    Optional filters: is_approved=true|false, updated_since=<ISO 8601 date or datetime>.
+    The stream is gzip-compressed when the client sends Accept-Encoding: gzip.
+    """
+    queryset = Company.objects.order_by('id')
+    
+    is_approved = request.GET.get('is_approved')
+    if is_approved is not None:
+        if is_approved.lower() not in ('true', 'false', '1', '0'):
+            return JsonResponse({'error': 'is_approved must be true or false'}, status=400)
+        queryset = queryset.filter(is_approved=is_approved.lower() in ('true', '1'))
+    
+    updated_since = request.GET.get('updated_since')
+    if updated_since is not None:
+        since = _parse_since(updated_since.strip())
+        if since is None:
+            return JsonResponse({'error': 'updated_since must be an ISO 8601 date or datetime'}, status=400)
+        queryset = queryset.filter(updated_at__gte=since)
+    
+    content = iter_ndjson(queryset, CompanyExportSerializer, settings.EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response.streaming_content = compress_sequence(response.streaming_content)
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Disposition'] = 'inline; filename="companies.ndjson"'
+    return response
+
+
+@api_view(['GET'])
+def company_changes_view(request):
+    """
+    GET /api/companies/changes?since=<token>&limit=500
+    Companies created or updated, and companies deleted, after the token.
+    Without a token the feed starts from the beginning. Keep calling with `next`
+    while `hasMore` is true, then poll again later with the last `next`.
+    """
+    try:
+        position = decode_token(request.query_params.get('since', '').strip())
+    except InvalidToken as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = min(max(int(request.query_params.get('limit', 500)), 1), 1000)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    companies, tombstones, next_position, has_more = read_changes(position, limit)
+    return Response({
+        'updated': CompanyChangeSerializer(companies, many=True).data,
+        'deleted': [
+            {
+                'id': tombstone.company_id,
+                'company': tombstone.company,
+                'domains': tombstone.domains,
+                'deleted_at': tombstone.deleted_at,
+            }
+            for tombstone in tombstones
+        ],
+        'next': encode_token(next_position),
+        'hasMore': has_more,
+    })
@@ -5,6 +5,7 @@ Django settings for sustainability_api project.
 from pathlib import Path
 import environ
 import os
+import sys
 
 env = environ.Env(
     DEBUG=(bool, False)
@@ -29,6 +30,8 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # Full-text and trigram lookups (search on PostgreSQL)
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -89,6 +92,54 @@ DATABASES = {
     }
 }
 
+# Shared cache used for API responses and cross-worker state.
+# file (default): shared by all gunicorn workers on a host, no extra services;
+#   its add() isn't atomic, so coalescing locks are O_EXCL lock files (companies.cache.acquire_lock)
+# db: shared across hosts through the database (run `python manage.py createcachetable`)
+# redis: shared across hosts, set REDIS_URL (needs `pip install redis`)
+# locmem: per-process, used automatically by `manage.py test`
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+REDIS_URL = env('REDIS_URL', default='')
+CACHE_BACKEND = 'locmem' if TESTING else env('CACHE_BACKEND', default='redis' if REDIS_URL else 'file')
+CACHE_MAX_ENTRIES = env.int('CACHE_MAX_ENTRIES', default=50000)
+CACHE_BACKENDS = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': env('CACHE_LOCATION', default='/tmp/sustainability_api_cache'),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': env('CACHE_LOCATION', default='api_cache'),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sustainability-api',
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+}
+API_CACHE_ALIAS = 'default'
+# Cached responses are keyed by the dataset generation, so they can live long;
+# clients get a short max-age so invalidation reaches them quickly (seconds).
+API_CACHE_TIMEOUT = env.int('CACHE_TIMEOUT', default=60 * 60 * 24)
+API_CACHE_CLIENT_MAX_AGE = env.int('CACHE_CLIENT_MAX_AGE', default=60 * 5)
+# Expired responses are still served for this long while one request recomputes them
+API_CACHE_STALE_TIMEOUT = env.int('CACHE_STALE_TIMEOUT', default=60 * 10)
+# Recompute lock lifetime, and how long other requests wait for a missing entry (seconds)
+API_CACHE_LOCK_TIMEOUT = env.int('CACHE_LOCK_TIMEOUT', default=30)
+API_CACHE_LOCK_WAIT = env.float('CACHE_LOCK_WAIT', default=5.0)
+# How long the generation counter is trusted in the cache before re-reading DataVersion
+# (None = forever; only needed when hosts don't share a cache backend)
+DATASET_GENERATION_TIMEOUT = None if CACHE_BACKEND == 'redis' else env.int('DATASET_GENERATION_TIMEOUT', default=60)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -119,10 +170,37 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 50,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'companies.renderers.FastJSONRenderer',
     ],
 }
 
+# JSON encoder behind FastJSONRenderer: auto (orjson when installed), orjson or python
+JSON_BACKEND = env('JSON_BACKEND', default='auto')
+
+# Full-text search (?q=): auto (PostgreSQL full-text on PostgreSQL, in-memory index elsewhere),
+# postgres or memory. The in-memory index returns at most SEARCH_MAX_RESULTS matches.
+SEARCH_BACKEND = env('SEARCH_BACKEND', default='auto')
+SEARCH_MAX_RESULTS = env.int('SEARCH_MAX_RESULTS', default=1000)
+# Fuzzy name search (?fuzzy=true): minimum trigram similarity and number of results returned
+SEARCH_FUZZY_THRESHOLD = env.float('SEARCH_FUZZY_THRESHOLD', default=0.3)
+SEARCH_FUZZY_LIMIT = env.int('SEARCH_FUZZY_LIMIT', default=20)
+
+# Search-as-you-type suggestions (GET /api/companies/suggest): default and maximum ?limit=
+SUGGEST_DEFAULT_LIMIT = env.int('SUGGEST_DEFAULT_LIMIT', default=10)
+SUGGEST_MAX_LIMIT = env.int('SUGGEST_MAX_LIMIT', default=20)
+
+# In-process domain snapshot used by the domain lookup endpoint.
+# Each worker checks the dataset generation at most once per interval (seconds).
+DOMAIN_SNAPSHOT_ENABLED = env.bool('DOMAIN_SNAPSHOT_ENABLED', default=True)
+DOMAIN_SNAPSHOT_CHECK_INTERVAL = env.int('DOMAIN_SNAPSHOT_CHECK_INTERVAL', default=5)
+
+# Bloom filter over company domains used to reject definite misses without a query.
+# Rebuilt on the same generation check as the snapshot.
+DOMAIN_FILTER_ENABLED = env.bool('DOMAIN_FILTER_ENABLED', default=True)
+DOMAIN_FILTER_FALSE_POSITIVE_RATE = env.float('DOMAIN_FILTER_FALSE_POSITIVE_RATE', default=0.001)
+# How long published filter artifacts are kept for serving deltas (seconds)
+DOMAIN_FILTER_HISTORY_TIMEOUT = env.int('DOMAIN_FILTER_HISTORY_TIMEOUT', default=60 * 60 * 24 * 7)
+
 CORS_ALLOWED_ORIGINS = env.list('CORS_ALLOWED_ORIGINS', default=[
     'http://localhost:3000',
     'http://127.0.0.1:3000',
@@ -143,6 +221,27 @@ CORS_ALLOWED_HEADERS = [
     'x-requested-with',
 ]
 
+# Write-behind buffer for domain-miss telemetry (CompanyRequest counts).
+# Flushed as one bulk upsert every interval (seconds) or once this many domains are pending.
+MISS_BUFFER_ENABLED = env.bool('MISS_BUFFER_ENABLED', default=True)
+MISS_BUFFER_FLUSH_INTERVAL = env.int('MISS_BUFFER_FLUSH_INTERVAL', default=10)
+MISS_BUFFER_MAX_ENTRIES = env.int('MISS_BUFFER_MAX_ENTRIES', default=500)
+
+# Rows fetched per server-side cursor round trip by the NDJSON export
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
+# The change feed only returns rows older than this many seconds, so rows from
+# transactions that commit out of timestamp order are picked up by the next poll
+CHANGE_FEED_LAG = env.int('CHANGE_FEED_LAG', default=5)
+
+# Let the extension read the domain filter version headers
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'x-data-version',
+    'x-data-generation',
+    'x-filter-format',
+    'x-filter-base',
+]
 
 CSRF_COOKIE_SECURE = not DEBUG
 SESSION_COOKIE_SECURE = not DEBUG
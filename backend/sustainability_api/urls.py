@@ -12,7 +12,12 @@ logger = logging.getLogger(__name__)
 
 def health_check(request):
     """Health check endpoint similar to the Node.js version."""
+    from companies.cache import cache_stats
     from companies.models import Company
+    from companies.search import full_text_index, trigram_index
+    from companies.snapshot import domain_filter, domain_snapshot
+    from companies.suggest import suggest_index
+    from companies.telemetry import miss_buffer
 
     try:
         company_count = Company.objects.count()
@@ -20,6 +25,13 @@ def health_check(request):
             'status': 'ok',
             'timestamp': timezone.now().isoformat(),
             'recordCount': company_count,
+            'domainSnapshot': domain_snapshot.stats(),
+            'domainFilter': domain_filter.stats(),
+            'searchIndex': full_text_index.stats(),
+            'trigramIndex': trigram_index.stats(),
+            'suggestIndex': suggest_index.stats(),
+            'missBuffer': miss_buffer.stats(),
+            'cache': cache_stats(),
             'service': 'sustainability-api-django'
         })
     except Exception as e:
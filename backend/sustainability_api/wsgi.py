@@ -8,4 +8,11 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sustainability_api.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Build the per-worker domain snapshot and suggestion index before serving the first request
+from companies.snapshot import warm_domain_snapshot  # noqa: E402
+from companies.suggest import warm_suggest_index  # noqa: E402
+
+warm_domain_snapshot()
+warm_suggest_index()